@@ -1,13 +1,58 @@
 # analysis.py
-from llm_client import generate_response
+from llm_client import generate_response, generate_response_stream, is_error_response
+from llm_scheduler import PRIORITY_INTERACTIVE, PRIORITY_PAGE
+from chat_memory import format_turn
+from ipo_extractor import render_key_details
+from prompt_context import (
+    clean_article, compact_prompt, encode_market_tables, encode_scrip_details, trim_to_budget,
+)
+from retrieval import estimate_tokens, select_context
+from telemetry import count, traced
 import pandas as pd
 
-def get_in_depth_ipo_analysis(ipo_title, ipo_content):
+# How long each kind of AI answer stays in the response cache (seconds, None = forever).
+# The market briefing expires with the market snapshot it was built from; a published
+# IPO article never changes, so its analysis is kept for good.
+IPO_ANALYSIS_TTL = None
+SCRIP_ANALYSIS_TTL = 60 * 60
+MARKET_SUMMARY_TTL = 5 * 60
+CHAT_RESPONSE_TTL = 10 * 60
+# The same fold of chat turns into a summary (a rerun, another worker) comes from the response cache
+CHAT_SUMMARY_TTL = 60 * 60
+
+# Max tokens of article/JSON context sent with a single chat question
+CHAT_CONTEXT_TOKEN_BUDGET = 1200
+# Max tokens of (cleaned) article text sent for an IPO report
+IPO_ARTICLE_TOKEN_BUDGET = 1500
+
+
+def _respond(prompt, cache_ttl, stream, priority=PRIORITY_PAGE, user=None, kind="other"):
+    # stream=True hands back a generator of text chunks instead of the finished string
+    prompt = compact_prompt(prompt)
+    # prompt size per kind of report, the average is prompt_tokens / prompts on the Performance page
+    count("llm.prompts", kind=kind)
+    count("llm.prompt_tokens", estimate_tokens(prompt), kind=kind)
+    if stream:
+        return generate_response_stream(prompt, cache_ttl=cache_ttl, priority=priority, user=user)
+    return generate_response(prompt, cache_ttl=cache_ttl, priority=priority, user=user)
+
+@traced("analysis.ipo_analysis")
+def get_in_depth_ipo_analysis(ipo_title, ipo_content, stream=False, priority=PRIORITY_PAGE, user=None, details=None):
     """
     Analyzes the full content of an IPO article.
   And intelligently decides whether to provide a detailed  report (for upcoming IPOs)
     or a general summary (for other news) if the topic is not about coming ipos but about updates of previous ipos.
+
+    With `details` from ipo_extractor for an upcoming issue, the key details and opening range are
+    already known: only the narrative part of the article is sent and the answer covers the
+    remaining sections (the caller renders the rest, see ipo_extractor.render_key_details).
     """
+    if details and details.get("is_offer"):
+        return _respond(_ipo_narrative_prompt(ipo_title, details), IPO_ANALYSIS_TTL, stream,
+                        priority=priority, user=user, kind="ipo_narrative")
+
+    ipo_content = trim_to_budget(clean_article(ipo_content), IPO_ARTICLE_TOKEN_BUDGET)
+
     prompt = f"""
     You are an expert financial analyst for the Nepal stock market (NEPSE).
     Your task is to analyze the following news article.
@@ -47,20 +92,66 @@ def get_in_depth_ipo_analysis(ipo_title, ipo_content):
     - **Opening Range Estimate:** Based on the company's latest Net Worth Per Share (if mentioned in the article), what is the legally permissible opening price range for its first day of trading? (Explain that it's typically 1x to 3x the Net Worth Per Share). If the net worth is not mentioned, state that this cannot be estimated from the provided text.
     ---
     """
-    return generate_response(prompt)
+    return _respond(prompt, IPO_ANALYSIS_TTL, stream, priority=priority, user=user, kind="ipo_analysis")
+
+
+def _ipo_narrative_prompt(ipo_title, details):
+    narrative = trim_to_budget(clean_article(details["narrative"]), IPO_ARTICLE_TOKEN_BUDGET)
+    return f"""
+    You are an expert financial analyst for the Nepal stock market (NEPSE).
+    The key details of this upcoming IPO have already been extracted and are shown to the reader above your answer:
+
+    {render_key_details(details)}
+
+    **Title:** {ipo_title}
+
+    **Rest of the Article:**
+    ---
+    {narrative or "(nothing beyond the key details)"}
+    ---
+
+    Continue the report with exactly these two sections, in markdown. Don't repeat the key details.
+
+    ### 2. Company & Sector Analysis
+    - **Company Business:** What does the company do? What is its main line of business?
+    - **Purpose of IPO:** Why is the company raising this money? (e.g., project development, loan repayment.)
+    - **Sector Outlook:** Briefly comment on the outlook for this company's sector (e.g., Hydropower, Finance) in Nepal.
+
+    ### 3. AI Speculation & Educational Insights
+    **IMPORTANT DISCLAIMER: The following is AI-generated speculation based on public data and is for educational purposes only. It is NOT financial advice. Always do your own research (DYOR).**
+
+    - **Application Strategy:** Based on NEPSE's allotment rules where most IPOs are heavily oversubscribed, what is the standard application strategy for retail investors? (Hint: Mention the standard 10-unit application).
+    - **Potential Demand:** Based on the article, comment on the likely demand for this IPO.
+
+    End after the Potential Demand bullet, the opening range estimate is added separately.
+    """
 
 
-def analyze_scrip_details(scrip_data):
+@traced("analysis.scrip_analysis")
+def analyze_scrip_details(scrip_data, stream=False, indicators=None, user=None):
     """
     Analyzes the detailed JSON data for a single company and provides a structured report.
+    `scrip_data` is the getCompanyDetails response (dict or JSON text); only the fields the
+    report uses are sent (prompt_context.SCRIP_FIELDS).
+    `indicators` is an optional dict of precomputed technicals (see screener.load_symbol_indicators).
     """
+    indicator_lines = "\n".join(f"- {name}: {value}" for name, value in (indicators or {}).items() if name != "symbol")
+    technical_section = f"""
+    Precomputed Technical Indicators (computed from daily price history, trust these numbers):
+    {indicator_lines}
+
+    ### 📉 Technical Snapshot
+    Using the precomputed indicators, explain trend (price vs SMA/EMA), momentum (RSI: above 70 overbought, below 30 oversold),
+    where the price sits in its 52-week range and whether today's volume is unusual.
+    """ if indicator_lines else ""
+
     prompt = f"""
-    You are a financial analyst. Analyze the following raw JSON data for a company listed on NEPSE
+    You are a financial analyst. Analyze the following data for a company listed on NEPSE
     and present a clear, easy-to-understand report in markdown format.
 
-    Raw Company Data:
-    ```json
-    {scrip_data}
+    Company Data:
+    ```
+    {encode_scrip_details(scrip_data)}
     ```
 
     Your report should be structured as follows:
@@ -78,28 +169,30 @@ def analyze_scrip_details(scrip_data):
     ### 📊 Fundamental Snapshot
     - **Listed Shares:**
     - **Paid-Up Capital:**
-
+    {technical_section}
     ### 💡 AI Interpretation for Beginners
     Based on all the data, provide a simple, one-paragraph interpretation. Explain what this information means. For example, is the stock trading closer to its yearly high or low? Is the market capitalization large or small for the Nepali market?
     """
-    return generate_response(prompt)
+    return _respond(prompt, SCRIP_ANALYSIS_TTL, stream, user=user, kind="scrip_analysis")
 
 
-def get_market_summary_from_data(gainers_df, losers_df, turnover_df):
+@traced("analysis.market_summary")
+def get_market_summary_from_data(gainers_df, losers_df, turnover_df, priority=PRIORITY_PAGE, user=None):
     """
     Analyzes market data DataFrames to produce a daily market briefing.
     """
+    tables = encode_market_tables(gainers_df, losers_df, turnover_df)
     prompt = f"""
     You are a stock market analyst for NEPSE. Based on the following data, provide a "Daily Market Insight" summary in markdown. And donot mention anything about date in topic or saying something like "insert date" etc are strongly prohibited.
 
-    Top 5 Gainers:
-    {gainers_df.head().to_string()}
+    Top 5 Gainers (CSV):
+    {tables["gainers"]}
 
-    Top 5 Losers:
-    {losers_df.head().to_string()}
+    Top 5 Losers (CSV):
+    {tables["losers"]}
 
-    Top 5 by Turnover:
-    {turnover_df.head().to_string()}
+    Top 5 by Turnover (CSV):
+    {tables["turnover"]}
 
     Your analysis should cover:
     1.  **Overall Market Sentiment:** The general mood of the market today.
@@ -107,14 +200,16 @@ def get_market_summary_from_data(gainers_df, losers_df, turnover_df):
     3.  **Notable Movers:** Interesting companies from the lists.
     4.  **A brief takeaway for investors.**
     """
-    return generate_response(prompt)
+    return _respond(prompt, MARKET_SUMMARY_TTL, False, priority=priority, user=user, kind="market_summary")
 
 
 #=======
 
-def get_chat_response(query, context=None):
+@traced("analysis.chat_response")
+def get_chat_response(query, context=None, stream=False, context_token_budget=CHAT_CONTEXT_TOKEN_BUDGET, user=None, history=None):
     """
     Generates a context-aware response for the chatbot. This new version is significantly more intelligent.
+    `history` is the bounded conversation so far (ChatMemory.history()), so follow-up questions keep their meaning.
     """
     # This is the new, more sophisticated "brain" for the chatbot.
     system_prompt = """
@@ -134,31 +229,43 @@ def get_chat_response(query, context=None):
         - Example Question: "Who is the issue manager for this IPO?"
         - Example Answer: "Based on the article provided, the issue manager is [Name from Article]..."
 
-    3.  **Stock Context (JSON Data):**
-        - If you are given context of `type: 'Stock'` with JSON data, you MUST prioritize information from that JSON to answer.
+    3.  **Stock Context (Company Data):**
+        - If you are given context of `type: 'Stock'` with company data (`field: value` lines), you MUST prioritize information from that data to answer.
         - You can ask the user to check the 'Stock Analysis' page for the full report.
         - Example Question: "What is the 52-week high for this stock?"
-        - Example Answer: "According to the data, the 52-week high for this stock is [Value from JSON]..."
+        - Example Answer: "According to the data, the 52-week high for this stock is [Value from the data]..."
 
     **General Rules:**
     - Be polite, encouraging, and clear, especially with beginners.
     - **Give direct financial advice** (e.g., "buy this stock"). Provide information and explain concepts.
     - You can guide users on how to use the app. For example, if they ask about top gainers, tell them to check the "Market Overview" page.
+    - If the conversation so far is given, use it to understand follow-up questions (e.g. "what about its dividend?").
     """
+    conversation = f"""
+        ---
+        **CONVERSATION SO FAR:**
+        {history}
+        ---
+        """ if history else ""
     
     if context and isinstance(context, dict) and 'data' in context:
         context_type = context.get('type', 'Unknown')
         context_name = context.get('title') or context.get('symbol', 'N/A')
+        context_data = context['data']
+        if context_type == 'IPO':
+            context_data = clean_article(context_data)
+        # only the passages/fields relevant to this question, not the whole article or JSON
+        context_data = select_context(context_data, query, token_budget=context_token_budget)
         
         full_prompt = f"""{system_prompt}
-
+        {conversation}
         ---
         **CURRENT CONTEXT FOR THIS QUERY:**
         - **Type:** {context_type}
         - **Name:** {context_name}
         - **Data:** 
         ```
-        {context['data']}
+        {context_data}
         ```
         ---
 
@@ -168,7 +275,32 @@ def get_chat_response(query, context=None):
         """
     else:
         # Fallback to general knowledge if no context is provided
-        full_prompt = f"{system_prompt}\n\n**A user is asking a general question. Use your 'No Context' mode to answer.**\n\n**User's Question:** {query}"
+        full_prompt = f"{system_prompt}\n{conversation}\n**A user is asking a general question. Use your 'No Context' mode to answer.**\n\n**User's Question:** {query}"
         
-    return generate_response(full_prompt)
+    return _respond(full_prompt, CHAT_RESPONSE_TTL, stream, priority=PRIORITY_INTERACTIVE, user=user, kind="chat")
+
+
+@traced("analysis.chat_summary")
+def summarize_chat(summary, turns, user=None):
+    """
+    Folds older chat turns [(question, answer)] into the running conversation summary.
+    Returns the new summary, or None if the call failed. Used as ChatMemory.fold()'s summarizer.
+    """
+    earlier = summary or "(none)"
+    new_turns = "\n\n".join(format_turn(question, answer) for question, answer in turns)
+    prompt = f"""
+    You keep the memory of a conversation between a user and 'NEPSE Sahayogi', an assistant for the Nepali share market.
+
+    **Summary so far:**
+    {earlier}
+
+    **Newer turns:**
+    {new_turns}
+
+    Write the updated summary in at most 120 words, as plain sentences. Keep what later questions may
+    refer back to: company symbols and names, IPOs, numbers, the user's holdings, goals and preferences,
+    and what was already answered. Drop greetings and small talk.
+    """
+    text = _respond(prompt, CHAT_SUMMARY_TTL, stream=False, priority=PRIORITY_PAGE, user=user, kind="chat_summary")
+    return None if is_error_response(text) else text
 
@@ -1,58 +1,123 @@
 import streamlit as st
 import pandas as pd
-import json
+import time
+import uuid
 from datetime import datetime, timedelta
-from deep_translator import GoogleTranslator
 
-# project modules
-from scraper import scrape_upcoming_ipos
+# project modules. Heavy, page-specific ones (pyarrow snapshots, the screener, the Gemini SDK,
+# deep_translator) are imported where they are first used, so the sidebar and the market
+# tables don't wait for them; `python benchmarks/startup.py` reports the import bill.
+from ipo_extractor import render_key_details, render_opening_range
+from market_diff import briefing_basis, changed_keys, index_lookup, is_material_move
+from market_schema import DISPLAY_COLUMNS
+from prompt_context import encode_scrip_details
+from translation import get_translation_service
+from background import BACKGROUND_REFRESH_ENABLED, RefreshScheduler, is_market_open
+from settings import NEPAL_TZ
+from telemetry import ADMIN_PAGE_ENABLED, observe, telemetry
+from cache_backend import get_shared_cache, shared_cached
 from market_data import get_market_data, get_all_companies, get_company_details
+from llm_client import is_error_response, scheduler as llm_scheduler, warm_up as warm_up_llm
 from analysis import (
     get_in_depth_ipo_analysis, 
     get_market_summary_from_data, 
     analyze_scrip_details,
-    get_chat_response
+    get_chat_response,
+    summarize_chat
 )
 
+render_started = time.perf_counter()
+
 # Streamlit config
 st.set_page_config(
     page_title="Nepal Stock Market Hub",
     layout="wide"
 )
 
-# Session state stuff (for chat history, rate limit, etc.)
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-if "last_query_time" not in st.session_state:
-    st.session_state.last_query_time = None
-if "query_count" not in st.session_state:
-    st.session_state.query_count = 0
+# Session state stuff (for chat history, AI quota, etc.)
+if "chat_memory" not in st.session_state:
+    from chat_memory import ChatMemory
+    st.session_state.chat_memory = ChatMemory()
+if "user_id" not in st.session_state:
+    # identifies this session to the shared LLM scheduler's per-user quota
+    st.session_state.user_id = uuid.uuid4().hex
 if "current_context" not in st.session_state:
     st.session_state.current_context = None
 
-# Cache functions (so we don't overload APIs every time)
-@st.cache_data(ttl=600)
-def cached_scrape_ipos(): return scrape_upcoming_ipos()
+# Cache functions (so we don't overload APIs every time). These go through the shared cache,
+# so all app workers/replicas reuse one result and only one of them recomputes an expired key
+# while the rest keep serving the stale copy. Failed fetches are never cached.
+def is_ok(result): return not isinstance(result, str) and not (isinstance(result, dict) and "error" in result)
+
+@shared_cached("scrape_ipos", ttl=600, cache_if=is_ok)
+def cached_scrape_ipos():
+    from scraper import scrape_upcoming_ipos
+    return scrape_upcoming_ipos()
+
+def fetch_market_data():
+    market_data = get_market_data()
+    # the background refresher records its own snapshots, only record here when it's off
+    if not refresh_scheduler:
+        from snapshot_store import record_snapshot
+        record_snapshot(market_data)
+    return market_data
+
+@shared_cached("market_data", ttl=300, cache_if=is_ok)
+def cached_get_market_data(): return fetch_market_data()
+
+# Live mode on Market Overview reruns just the page's fragments this often (seconds); the
+# shorter-lived cache entry still means one NEPSE fetch per interval for all sessions together
+LIVE_REFRESH_SECONDS = 30
+# ...and checks this often whether the market opened or closed, to start or stop that timer
+LIVE_STATUS_CHECK_SECONDS = 60
 
-@st.cache_data(ttl=300)
-def cached_get_market_data(): return get_market_data()
+@shared_cached("market_data_live", ttl=LIVE_REFRESH_SECONDS, cache_if=is_ok)
+def cached_get_live_market_data(): return fetch_market_data()
 
-@st.cache_data(ttl=3600)
+@shared_cached("all_companies", ttl=3600, cache_if=is_ok)
 def cached_get_all_companies(): return get_all_companies()
 
-@st.cache_data(ttl=300)
+# Search index is rebuilt only when the (hourly cached) company list changes
+@st.cache_resource(ttl=3600)
+def get_symbol_index(company_df):
+    from symbol_search import SymbolSearchIndex
+    return SymbolSearchIndex(company_df)
+
+@shared_cached("company_details", ttl=300, cache_if=is_ok)
 def cached_get_company_details(symbol): return get_company_details(symbol)
 
-# Translation helper (simple but works fine)
-@st.cache_data
+# Daily history only changes once per trading day, a few hours of caching is plenty. An empty
+# result means the history fetch failed, it is retried on the next view instead of cached.
+@shared_cached("market_indicators", ttl=6 * 3600, cache_if=lambda df: not df.empty)
+def cached_load_market_indicators():
+    from screener import load_market_indicators
+    return load_market_indicators(cached_get_all_companies())
+
+@shared_cached("symbol_indicators", ttl=6 * 3600, cache_if=bool)
+def cached_load_symbol_indicators(symbol):
+    from screener import load_symbol_indicators
+    return load_symbol_indicators(symbol)
+
+# Background refresher shared by every session of this server process. Pages use its
+# ready-made results when it has them and only compute on the request path before the first refresh.
+@st.cache_resource
+def get_refresh_scheduler():
+    return RefreshScheduler().start() if BACKGROUND_REFRESH_ENABLED else None
+
+refresh_scheduler = get_refresh_scheduler()
+
+def precomputed(key):
+    return refresh_scheduler.store.get(key) if refresh_scheduler else None
+
+# Translation helper: static UI strings come from the shipped catalog, everything else
+# from the persistent dictionary, and only genuinely new text goes to the network
+translation_service = get_translation_service()
+
 def translate_text(text, dest_lang='en'):
-    if not text or not isinstance(text, str) or dest_lang == 'en':
-        return text
-    try:
-        return GoogleTranslator(source='auto', target=dest_lang).translate(text)
-    except Exception as e:
-        print(f"Translation Error: {e}")
-        return text
+    started = time.perf_counter()
+    translated = translation_service.translate(text, dest_lang)
+    observe("translate_text", (time.perf_counter() - started) * 1000, lang=dest_lang)
+    return translated
 
 # Sidebar UI
 with st.sidebar:
@@ -60,37 +125,57 @@ with st.sidebar:
     st.selectbox(translate_text("भाषा / Language", "ne" if st.session_state.get('language') == 'नेपाली' else 'en'), ["English", "नेपाली"], key='language')
     lang_code = 'ne' if st.session_state.language == 'नेपाली' else 'en'
     
-    page_options = ["Market Overview", "IPO Center", "Stock Analysis", "AI Chat Assistant"]
-    translated_page_options = [translate_text(page, lang_code) for page in page_options]
-    
-    selected_translated_page = st.radio(
+    page_options = ["Market Overview", "IPO Center", "Stock Analysis", "Stock Screener", "Portfolio", "AI Chat Assistant"]
+    if ADMIN_PAGE_ENABLED:
+        page_options.append("Performance")
+    # options are the stable English page names, only their labels are translated
+    page = st.radio(
         translate_text("Choose a section", lang_code),
-        translated_page_options,
-        label_visibility="collapsed"
+        page_options,
+        format_func=lambda option: translate_text(option, lang_code),
+        label_visibility="collapsed",
+        key="page"
     )
-    page = page_options[translated_page_options.index(selected_translated_page)]
     
     st.markdown("---")
     st.write(translate_text("Having issues or want the latest data?", lang_code))
     if st.button(translate_text("Clear Cache & Refresh Data", lang_code)):
         st.cache_data.clear()
+        get_shared_cache().clear()
+        if refresh_scheduler:
+            refresh_scheduler.invalidate()
+        # Market Overview's per-session live state (see below)
+        for key in ("last_market", "index_cards", "market_briefing"):
+            st.session_state.pop(key, None)
         st.rerun()
     st.markdown("---")
     st.info(translate_text(
         "This app uses AI + unofficial APIs. Info here is educational only, do your own research before investing.", lang_code))
 
-# reusable function for displaying dataframes
+# Translated headers and number formats for the market/IPO tables, built once per language and
+# handed to st.dataframe as column_config, so frames are rendered as they are, never copied or renamed
+@st.cache_resource(ttl=3600)
+def table_column_config(lang):
+    labels = translation_service.translate_many([label for label, _ in DISPLAY_COLUMNS.values()], lang)
+    return {
+        column: st.column_config.NumberColumn(labels[label], format=number_format) if number_format else st.column_config.Column(labels[label])
+        for column, (label, number_format) in DISPLAY_COLUMNS.items()
+    }
+
 def display_styled_dataframe(df):
     if df.empty: return
-    column_rename_map = {
-        'symbol': translate_text('Symbol', lang_code), 'ltp': translate_text('LTP', lang_code), 
-        'pointChange': translate_text('Change', lang_code), 'percentageChange': translate_text('% Change', lang_code),
-        'turnover': translate_text('Turnover', lang_code), 'lastTradedPrice': translate_text('LTP', lang_code), 
-        'title': translate_text('IPO Announcement', lang_code), 'date': translate_text('Date', lang_code), 
-        'link': translate_text('Source', lang_code)
-    }
-    df_display = df.copy().rename(columns=lambda x: column_rename_map.get(x, x))
-    st.dataframe(df_display, use_container_width=True, hide_index=True)
+    st.dataframe(df, use_container_width=True, hide_index=True, column_config=table_column_config(lang_code))
+
+# Streams an AI answer onto the page as it is generated. Nepali users see the English text
+# stream in and then swap to the translation once the full answer is available.
+# Returns (answer as generated, answer as shown).
+def render_ai_stream(chunks):
+    placeholder = st.empty()
+    text = shown = placeholder.write_stream(chunks)
+    if lang_code != 'en':
+        shown = translate_text(text, lang_code)
+        placeholder.markdown(shown)
+    return text, shown
 
 # Main app pages:
 
@@ -98,22 +183,50 @@ if page == "Market Overview":
     st.session_state.current_context = None
     st.title(translate_text("Market Overview", lang_code))
     st.text(translate_text("Real-time NEPSE snapshot", lang_code))
-    
-    market_data = cached_get_market_data()
+    live = st.toggle(translate_text("Live updates", lang_code), key="live_market",
+                     help=translate_text("Refreshes the indices, tables and AI briefing in place while the market is open.", lang_code))
+
+    def load_market_data():
+        market = precomputed("market") or (cached_get_live_market_data() if live else cached_get_market_data())
+        # a failed poll keeps showing the last good snapshot of this session
+        if is_ok(market):
+            st.session_state.last_market = market
+            return market
+        return st.session_state.get("last_market", market)
+
+    market_data = load_market_data()
     
     if isinstance(market_data, dict) and "error" in market_data:
         st.error(translate_text(f"Failed to fetch market data: {market_data['error']}", lang_code))
     else:
-        with st.container(border=True):
-            st.subheader(translate_text("Today's AI Market Briefing", lang_code))
-            with st.spinner(translate_text("AI analyzing the market...", lang_code)):
-                market_summary = get_market_summary_from_data(market_data['gainers'], market_data['losers'], market_data['turnover'])
-                st.markdown(translate_text(market_summary, lang_code))
+        if market_data.get('missing'):
+            st.warning(translate_text(f"Some market data could not be loaded: {', '.join(market_data['missing'])}", lang_code))
+
+        # In live mode only the fragments below rerun on the timer: the sidebar, the index history
+        # and everything else on the page stay as drawn. The index cards are only rebuilt for
+        # indices whose row changed since this session last drew them.
+        market_open = is_market_open(market_data)
+        run_every = LIVE_REFRESH_SECONDS if live and market_open else None
+        if live and not market_open:
+            st.caption(translate_text("The market is closed, live updates resume when it opens.", lang_code))
+
+        # Fragment timers are fixed when the page is drawn, so a full rerun is what switches them
+        # on at the open and off at the close
+        if live:
+            @st.fragment(run_every=LIVE_STATUS_CHECK_SECONDS)
+            def market_status_watch():
+                if is_market_open(load_market_data()) != market_open:
+                    st.rerun()
+
+            market_status_watch()
+
+        # The briefing keeps its place at the top, but is filled in after the tables are drawn
+        briefing_container = st.container(border=True)
         
         st.markdown("---")
         st.subheader(translate_text("Key Market Indicators", lang_code))
 
-        indices_df = market_data.get('indices', pd.DataFrame())
+        tab_names = ["Top Gainers", "Top Losers", "Top by Turnover", "All Indices"]
         index_names = [
             "NEPSE Index",
             "Microfinance Index",
@@ -130,33 +243,91 @@ if page == "Market Overview":
             "Finance Index",
             "Trading Index"
         ]
+        # every label this section needs, translated in one go before drawing anything
+        translation_service.prefetch(index_names + tab_names, lang_code)
 
-        # Display metrics in a 4-column grid
-        for row_start in range(0, len(index_names), 4):
-            cols = st.columns(4)
-            for i, index_name in enumerate(index_names[row_start:row_start+4]):
-                with cols[i]:
-                    if indices_df is not None and not indices_df.empty:
-                        row = indices_df[indices_df['index'] == index_name]
-                        if not row.empty:
-                            index_row = row.iloc[0]
-                            st.metric(
-                                label=translate_text(index_row['index'], lang_code),
-                                value=f"{index_row['currentValue']:.2f}",
-                                delta=f"{index_row['change']:.2f} ({index_row['perChange']:.2f}%)"
-                            )
-                        else:
-                            st.metric(label=translate_text(index_name, lang_code), value="N/A")
-                    else:
-                        st.metric(label=translate_text(index_name, lang_code), value="N/A")
-
-        st.subheader(translate_text("Market Data", lang_code))
-        tabs = [translate_text(t, lang_code) for t in ["Top Gainers", "Top Losers", "Top by Turnover", "All Indices"]]
-        tab1, tab2, tab3, tab4 = st.tabs(tabs)
-        with tab1: display_styled_dataframe(market_data.get('gainers', pd.DataFrame()))
-        with tab2: display_styled_dataframe(market_data.get('losers', pd.DataFrame()))
-        with tab3: display_styled_dataframe(market_data.get('turnover', pd.DataFrame()))
-        with tab4: st.dataframe(market_data.get('indices', pd.DataFrame()), use_container_width=True, hide_index=True)
+        @st.fragment(run_every=run_every)
+        def index_metrics():
+            # one dict lookup per card; cards are only rebuilt for indices whose row changed
+            rows = index_lookup(load_market_data().get('indices'))
+            state = st.session_state.setdefault("index_cards", {"lang": None, "rows": None, "cards": {}})
+            if state["lang"] != lang_code:
+                state.update(lang=lang_code, rows=None, cards={})
+            changed = changed_keys(state["rows"], rows)
+            for index_name in index_names:
+                if index_name in changed or index_name not in state["cards"]:
+                    row = rows.get(index_name)
+                    card = {"label": translate_text(index_name, lang_code), "value": "N/A"}
+                    if row and row.get('currentValue') is not None:
+                        card["value"] = f"{row['currentValue']:.2f}"
+                        if row.get('change') is not None and row.get('perChange') is not None:
+                            card["delta"] = f"{row['change']:.2f} ({row['perChange']:.2f}%)"
+                    state["cards"][index_name] = card
+            state["rows"] = rows
+
+            # Display metrics in a 4-column grid
+            for row_start in range(0, len(index_names), 4):
+                cols = st.columns(4)
+                for col, index_name in zip(cols, index_names[row_start:row_start+4]):
+                    col.metric(**state["cards"][index_name])
+            if run_every:
+                st.caption(f"{translate_text('Updated', lang_code)} {datetime.now(NEPAL_TZ):%H:%M:%S} · "
+                           f"{len(changed & set(index_names))} {translate_text('indices changed', lang_code)}")
+
+        index_metrics()
+
+        st.subheader(translate_text("Index History", lang_code))
+        history_ranges = {"Today": 0, "Last 5 days": 5, "Last 30 days": 30}
+        history_cols = st.columns([2, 3])
+        history_index = history_cols[0].selectbox(
+            translate_text("Index", lang_code), index_names, format_func=lambda name: translate_text(name, lang_code))
+        history_range = history_cols[1].radio(
+            translate_text("Range", lang_code), list(history_ranges), horizontal=True,
+            format_func=lambda label: translate_text(label, lang_code))
+        history_end = datetime.now(NEPAL_TZ)
+        history_start = (history_end - timedelta(days=history_ranges[history_range])).replace(hour=0, minute=0, second=0, microsecond=0)
+        from snapshot_store import get_snapshot_store
+        history_df = get_snapshot_store().query("indices", [history_index], start=history_start, end=history_end, columns=["currentValue"])
+        if history_df.empty:
+            st.caption(translate_text("No snapshots recorded for this range yet.", lang_code))
+        else:
+            st.line_chart(history_df, x="snapshot_time", y="currentValue")
+
+        @st.fragment(run_every=run_every)
+        def market_tables():
+            # the frames come typed and compact from market_data and are drawn as they are
+            market = load_market_data()
+
+            st.subheader(translate_text("Market Data", lang_code))
+            tabs = [translate_text(t, lang_code) for t in tab_names]
+            tab1, tab2, tab3, tab4 = st.tabs(tabs)
+            for tab, table in ((tab1, "gainers"), (tab2, "losers"), (tab3, "turnover"), (tab4, "indices")):
+                with tab:
+                    display_styled_dataframe(market.get(table, pd.DataFrame()))
+            if run_every:
+                st.caption(f"{translate_text('Updated', lang_code)} {datetime.now(NEPAL_TZ):%H:%M:%S}")
+
+        market_tables()
+
+        @st.fragment(run_every=run_every)
+        def market_briefing():
+            market = load_market_data()
+            st.subheader(translate_text("Today's AI Market Briefing", lang_code))
+            market_summary = precomputed("market_summary") if market is precomputed("market") else None
+            if market_summary is None:
+                # the briefing is only rewritten (an LLM call) once the market moved materially
+                briefing = st.session_state.get("market_briefing")
+                if briefing is None or is_material_move(briefing["basis"], market):
+                    with st.spinner(translate_text("AI analyzing the market...", lang_code)):
+                        market_summary = get_market_summary_from_data(market['gainers'], market['losers'], market['turnover'], user=st.session_state.user_id)
+                    if not is_error_response(market_summary):
+                        st.session_state.market_briefing = {"summary": market_summary, "basis": briefing_basis(market)}
+                else:
+                    market_summary = briefing["summary"]
+            st.markdown(translate_text(market_summary, lang_code))
+
+        with briefing_container:
+            market_briefing()
 
 
 
@@ -164,8 +335,10 @@ elif page == "IPO Center":
     st.title(translate_text("IPO Center", lang_code))
     st.text(translate_text("Latest IPOs + AI-powered analysis", lang_code))
     
-    with st.spinner(translate_text("Scraping latest IPO announcements...", lang_code)):
-        ipo_data = cached_scrape_ipos()
+    ipo_data = precomputed("ipos")
+    if ipo_data is None:
+        with st.spinner(translate_text("Scraping latest IPO announcements...", lang_code)):
+            ipo_data = cached_scrape_ipos()
     
     if isinstance(ipo_data, str):
         st.error(translate_text(f"Failed to scrape IPO data: {ipo_data}", lang_code))
@@ -179,11 +352,21 @@ elif page == "IPO Center":
                 st.session_state.current_context = {'type': 'IPO', 'title': selected_title, 'data': selected_row['content']}
                 
                 st.subheader(f"{translate_text('In-Depth Analysis for', lang_code)}: {selected_title}")
-                with st.spinner(translate_text("AI reading full article and generating insights...", lang_code)):
-                    ipo_analysis = get_in_depth_ipo_analysis(selected_title, selected_row['content'])
+                # Key details come straight from the extractor, the AI only writes the narrative sections
+                ipo_details = selected_row.get('details')
+                is_offer = bool(ipo_details and ipo_details.get('is_offer'))
+                if is_offer:
+                    st.markdown(translate_text(render_key_details(ipo_details), lang_code))
+                ipo_analysis = precomputed(f"ipo_analysis:{selected_row['link']}")
+                if ipo_analysis is not None:
                     st.markdown(translate_text(ipo_analysis, lang_code))
-                    with st.expander(translate_text("View Raw Article Text Scraped by AI", lang_code)):
-                        st.text(selected_row['content'])
+                else:
+                    render_ai_stream(get_in_depth_ipo_analysis(
+                        selected_title, selected_row['content'], stream=True, user=st.session_state.user_id, details=ipo_details))
+                if is_offer:
+                    st.markdown(translate_text(render_opening_range(ipo_details), lang_code))
+                with st.expander(translate_text("View Raw Article Text Scraped by AI", lang_code)):
+                    st.text(selected_row['content'])
 
 elif page == "Stock Analysis":
     st.title(translate_text("Stock Analysis", lang_code))
@@ -193,25 +376,130 @@ elif page == "Stock Analysis":
     if isinstance(company_df, dict) and "error" in company_df:
         st.error(translate_text(f"Could not load company list: {company_df['error']}", lang_code))
     else:
-        company_symbols = company_df['symbol'].tolist()
+        symbol_index = get_symbol_index(company_df)
+        search_query = st.text_input(
+            translate_text("Search by symbol, company name or sector:", lang_code),
+            placeholder=translate_text("Search like 'NABIL', 'HDL'...", lang_code)
+        )
+        if search_query:
+            matches = symbol_index.search(search_query, limit=20)
+            if not matches:
+                st.caption(translate_text("No matching companies found.", lang_code))
+        else:
+            matches = symbol_index.entries
+        match_labels = {m['symbol']: f"{m['symbol']} — {m['name']}" if m['name'] else m['symbol'] for m in matches}
         selected_symbol = st.selectbox(
             translate_text("Type or select a company symbol:", lang_code),
-            options=company_symbols, index=None, placeholder=translate_text("Search like 'NABIL', 'HDL'...", lang_code)
+            options=list(match_labels), index=0 if search_query and matches else None,
+            format_func=match_labels.get
         )
         if selected_symbol:
             st.subheader(f"{translate_text('Analysis for', lang_code)} {selected_symbol}")
-            with st.spinner(translate_text(f"Fetching + analyzing data for {selected_symbol}...", lang_code)):
+            with st.spinner(translate_text(f"Fetching data for {selected_symbol}...", lang_code)):
                 details = cached_get_company_details(selected_symbol)
-                if isinstance(details, dict) and "error" in details:
-                    st.error(translate_text(f"Could not fetch details: {details['error']}", lang_code))
-                else:
-                    details_str = json.dumps(details, indent=2)
-                    st.session_state.current_context = {'type': 'Stock', 'symbol': selected_symbol, 'data': details_str}
-                    
-                    ai_analysis = analyze_scrip_details(details_str)
-                    st.markdown(translate_text(ai_analysis, lang_code))
-                    with st.expander(translate_text("View Raw API Data", lang_code)):
-                        st.json(details)
+            if isinstance(details, dict) and "error" in details:
+                st.error(translate_text(f"Could not fetch details: {details['error']}", lang_code))
+            else:
+                # chat gets the same compact field list the report is built from, not the raw JSON
+                st.session_state.current_context = {'type': 'Stock', 'symbol': selected_symbol, 'data': encode_scrip_details(details)}
+
+                indicators = cached_load_symbol_indicators(selected_symbol)
+                render_ai_stream(analyze_scrip_details(details, stream=True, indicators=indicators, user=st.session_state.user_id))
+                with st.expander(translate_text("View Raw API Data", lang_code)):
+                    st.json(details)
+
+elif page == "Stock Screener":
+    st.title(translate_text("Stock Screener", lang_code))
+    st.text(translate_text("Technical indicators for every listed equity, computed in one pass", lang_code))
+
+    company_df = cached_get_all_companies()
+    if isinstance(company_df, dict) and "error" in company_df:
+        st.error(translate_text(f"Could not load company list: {company_df['error']}", lang_code))
+    else:
+        with st.spinner(translate_text("Loading price history for the whole market...", lang_code)):
+            indicators_df = cached_load_market_indicators()
+        if indicators_df.empty:
+            st.warning(translate_text("No price history is available right now.", lang_code))
+        else:
+            filter_cols = st.columns(3)
+            sectors = filter_cols[0].multiselect(translate_text("Sector", lang_code), sorted(indicators_df['sector'].unique()))
+            rsi_range = filter_cols[1].slider(translate_text("RSI (14)", lang_code), 0, 100, (0, 100))
+            min_spike = filter_cols[2].number_input(translate_text("Min. volume spike (x avg)", lang_code), min_value=0.0, value=0.0, step=0.5)
+
+            mask = indicators_df['volume_spike'].fillna(0) >= min_spike
+            if rsi_range != (0, 100):
+                mask &= indicators_df['rsi_14'].between(*rsi_range)
+            if sectors:
+                mask &= indicators_df['sector'].isin(sectors)
+            st.dataframe(indicators_df[mask], use_container_width=True, hide_index=True)
+
+            st.subheader(translate_text("Sector Aggregates", lang_code))
+            from screener import sector_summary
+            st.dataframe(sector_summary(indicators_df), use_container_width=True, hide_index=True)
+
+elif page == "Portfolio":
+    st.title(translate_text("Portfolio & Watchlist", lang_code))
+    st.text(translate_text("Enter your holdings; a quantity of 0 keeps a stock on the watchlist only", lang_code))
+
+    company_df = cached_get_all_companies()
+    if isinstance(company_df, dict) and "error" in company_df:
+        st.error(translate_text(f"Could not load company list: {company_df['error']}", lang_code))
+    else:
+        from portfolio import HOLDING_COLUMNS, fetch_quotes, normalize_holdings, sector_allocation, value_portfolio
+
+        # The editor's own state is dropped whenever another page is shown, so it restarts from the saved holdings
+        if "holdings_editor" not in st.session_state:
+            st.session_state.holdings = st.session_state.get("saved_holdings", pd.DataFrame(
+                {"symbol": pd.Series(dtype="string"), "quantity": pd.Series(dtype="float"), "avg_cost": pd.Series(dtype="float")}))
+        edited = st.data_editor(
+            st.session_state.holdings, num_rows="dynamic", use_container_width=True, hide_index=True, key="holdings_editor",
+            column_config={
+                "symbol": st.column_config.SelectboxColumn(translate_text("Symbol", lang_code), options=sorted(company_df["symbol"].dropna().unique()), required=True),
+                "quantity": st.column_config.NumberColumn(translate_text("Quantity", lang_code), min_value=0, step=1, default=0),
+                "avg_cost": st.column_config.NumberColumn(translate_text("Avg. cost (Rs.)", lang_code), min_value=0.0, format="%.2f"),
+            },
+        )
+        st.session_state.saved_holdings = edited
+        holdings = normalize_holdings(edited[HOLDING_COLUMNS])
+
+        if holdings.empty:
+            st.caption(translate_text("Add a row to start tracking.", lang_code))
+        else:
+            # every symbol fetched at once on a bounded pool, each through the same 5-minute cache as Stock Analysis
+            with st.spinner(translate_text("Fetching prices...", lang_code)):
+                quotes, failed = fetch_quotes(holdings["symbol"], cached_get_company_details)
+            if failed:
+                st.warning(translate_text(f"Could not fetch: {', '.join(failed)}", lang_code))
+            positions, totals = value_portfolio(holdings, quotes)
+
+            cols = st.columns(4)
+            cols[0].metric(translate_text("Market value", lang_code), f"Rs. {totals['market_value']:,.2f}")
+            cols[1].metric(translate_text("Day P&L", lang_code), f"Rs. {totals['day_pnl']:,.2f}", delta=f"{totals['day_pnl_pct']:.2f}%")
+            cols[2].metric(translate_text("Unrealized gain", lang_code), f"Rs. {totals['unrealized_gain']:,.2f}",
+                           delta=f"{totals['unrealized_gain'] / totals['cost'] * 100:.2f}%" if totals['cost'] else None)
+            cols[3].metric(translate_text("Positions", lang_code), totals['positions'])
+
+            st.dataframe(
+                positions[["symbol", "name", "sector", "quantity", "avg_cost", "ltp", "day_change_pct", "market_value", "day_pnl", "unrealized_gain", "unrealized_pct", "weight_pct"]],
+                use_container_width=True, hide_index=True,
+                column_config={
+                    "symbol": translate_text("Symbol", lang_code), "name": translate_text("Company", lang_code), "sector": translate_text("Sector", lang_code),
+                    "quantity": st.column_config.NumberColumn(translate_text("Quantity", lang_code), format="%d"),
+                    "avg_cost": st.column_config.NumberColumn(translate_text("Avg. cost (Rs.)", lang_code), format="%.2f"),
+                    "ltp": st.column_config.NumberColumn(translate_text("LTP", lang_code), format="%.2f"),
+                    "day_change_pct": st.column_config.NumberColumn(translate_text("% Change", lang_code), format="%.2f%%"),
+                    "market_value": st.column_config.NumberColumn(translate_text("Market value", lang_code), format="%.2f"),
+                    "day_pnl": st.column_config.NumberColumn(translate_text("Day P&L", lang_code), format="%.2f"),
+                    "unrealized_gain": st.column_config.NumberColumn(translate_text("Unrealized gain", lang_code), format="%.2f"),
+                    "unrealized_pct": st.column_config.NumberColumn(translate_text("Unrealized %", lang_code), format="%.2f%%"),
+                    "weight_pct": st.column_config.NumberColumn(translate_text("Weight", lang_code), format="%.1f%%"),
+                },
+            )
+
+            allocation = sector_allocation(positions)
+            if not allocation.empty:
+                st.subheader(translate_text("Sector Allocation", lang_code))
+                st.bar_chart(allocation, x="sector", y="weight_pct", horizontal=True)
 
 elif page == "AI Chat Assistant":
     st.title(f"💬 {translate_text('AI Chat Assistant (NEPSE Sahayogi)', lang_code)}")
@@ -219,33 +507,102 @@ elif page == "AI Chat Assistant":
     if st.session_state.current_context:
         context_type = st.session_state.current_context.get('type', 'N/A')
         context_name = st.session_state.current_context.get('title') or st.session_state.current_context.get('symbol')
-        st.info(f"**{translate_text('Context Loaded', lang_code)}:** {context_type} - {context_name}\n\n{translate_text('AI will use full data for this item.', lang_code)}")
+        st.info(f"**{translate_text('Context Loaded', lang_code)}:** {context_type} - {context_name}\n\n{translate_text('AI will use only the parts of this item relevant to your question.', lang_code)}")
     else:
         st.info(translate_text("No context loaded. Ask general questions or go to IPO/Stock section to load one.", lang_code))
 
-    st.warning(f"**{translate_text('Rate Limit', lang_code)}:** {translate_text('2 messages per minute', lang_code)}")
+    st.warning(f"**{translate_text('Rate Limit', lang_code)}:** {translate_text('6 AI requests per minute (shared across all pages)', lang_code)}")
+    queue_stats = llm_scheduler.stats()
+    st.caption(f"{translate_text('AI queue', lang_code)}: {queue_stats['queue_depth']} {translate_text('waiting', lang_code)}, "
+               f"{translate_text('average wait', lang_code)} {queue_stats['avg_wait_seconds']:.1f}s")
     
-    for message in st.session_state.messages:
+    # Only the newest page of the conversation is drawn; older pages are added on request
+    memory = st.session_state.chat_memory
+    shown_messages, has_older = memory.page(st.session_state.setdefault("chat_pages", 1))
+    if has_older and st.button(translate_text("Show earlier messages", lang_code)):
+        st.session_state.chat_pages += 1
+        st.rerun()
+    for message in shown_messages:
         with st.chat_message(message["role"]): st.markdown(message["content"])
 
     if prompt := st.chat_input(translate_text("Ask a question...", lang_code)):
-        st.session_state.messages.append({"role": "user", "content": prompt})
+        memory.add_message("user", prompt)
         with st.chat_message("user"): st.markdown(prompt)
 
-        current_time, allow_query = datetime.now(), False
-        if st.session_state.last_query_time is None or (current_time - st.session_state.last_query_time) > timedelta(minutes=1):
-            st.session_state.query_count, st.session_state.last_query_time, allow_query = 1, current_time, True
-        elif st.session_state.query_count < 2:
-            st.session_state.query_count += 1; allow_query = True
-        
-        if allow_query:
+        if llm_scheduler.has_quota(st.session_state.user_id):
             with st.chat_message("assistant"):
-                with st.spinner(translate_text("AI analyzing...", lang_code)):
-                    response = get_chat_response(prompt, context=st.session_state.current_context)
-                    translated_response = translate_text(response, lang_code)
-                    st.markdown(translated_response)
-                    st.session_state.messages.append({"role": "assistant", "content": translated_response})
+                response, translated_response = render_ai_stream(get_chat_response(
+                    prompt, context=st.session_state.current_context, stream=True, user=st.session_state.user_id,
+                    history=memory.history()))
+                memory.add_message("assistant", translated_response)
+            if not is_error_response(response):
+                memory.remember(prompt, response)
+                # older turns are summarized a batch at a time, after the answer is already on screen
+                if memory.needs_summary() and llm_scheduler.has_quota(st.session_state.user_id):
+                    memory.fold(lambda summary, turns: summarize_chat(summary, turns, user=st.session_state.user_id))
         else:
             error_message = translate_text("Rate limit exceeded. Wait a bit.", lang_code)
             with st.chat_message("assistant"): st.error(error_message)
-            st.session_state.messages.append({"role": "assistant", "content": error_message})
+            memory.add_message("assistant", error_message)
+
+elif page == "Performance":
+    # Admin-only view of this process's telemetry (enable with NEPSE_HUB_ADMIN=1)
+    from llm_client import response_cache
+
+    st.title(translate_text("Performance", lang_code))
+    snapshot = telemetry.snapshot(recent=200)
+    if not snapshot["enabled"]:
+        st.warning("Telemetry is disabled (NEPSE_HUB_TELEMETRY=0).")
+
+    llm_stats, llm_cache_stats, shared_stats = llm_scheduler.stats(), response_cache.stats(), get_shared_cache().stats()
+    cols = st.columns(4)
+    cols[0].metric("Uptime", f"{snapshot['uptime_seconds'] / 60:.0f} min")
+    cols[1].metric("LLM queue", llm_stats["queue_depth"], help=f"{llm_stats['running']} running, avg wait {llm_stats['avg_wait_seconds']:.1f}s")
+    cols[2].metric("LLM cache hit ratio", f"{llm_cache_stats['hit_ratio']:.0%}", help=f"{llm_cache_stats['entries']} entries")
+    shared_lookups = sum(shared_stats.values())
+    cols[3].metric("Shared cache hit ratio", f"{(shared_stats['hits'] + shared_stats['stale_hits']) / shared_lookups:.0%}" if shared_lookups else "N/A")
+
+    # label/attribute dicts as "key=value" text, so the tables stay flat
+    def telemetry_frame(rows, column):
+        frame = pd.DataFrame(rows)
+        if not frame.empty:
+            frame[column] = frame[column].map(lambda values: ", ".join(f"{k}={v}" for k, v in values.items()))
+        return frame
+
+    st.subheader("Latency")
+    st.dataframe(telemetry_frame(snapshot["histograms"], "labels"), use_container_width=True, hide_index=True)
+    st.subheader("Counters")
+    st.dataframe(telemetry_frame(snapshot["counters"], "labels"), use_container_width=True, hide_index=True)
+    if snapshot["hit_ratios"]:
+        st.dataframe(pd.DataFrame(snapshot["hit_ratios"].items(), columns=["cache", "hit_ratio"]), use_container_width=True, hide_index=True)
+    # average prompt size per kind of AI request (see analysis._respond)
+    prompt_counts = {c["labels"].get("kind"): c["value"] for c in snapshot["counters"] if c["name"] == "llm.prompts"}
+    prompt_tokens = {c["labels"].get("kind"): c["value"] for c in snapshot["counters"] if c["name"] == "llm.prompt_tokens"}
+    if prompt_counts:
+        st.subheader("Prompt size")
+        st.dataframe(pd.DataFrame(
+            [{"kind": kind, "prompts": n, "avg_tokens": round(prompt_tokens.get(kind, 0) / n)} for kind, n in prompt_counts.items()]
+        ), use_container_width=True, hide_index=True)
+    st.subheader("LLM scheduler")
+    st.json(llm_stats)
+    st.subheader("Recent spans")
+    recent_spans = telemetry_frame(snapshot["recent_spans"], "attributes")
+    if not recent_spans.empty:
+        recent_spans["start"] = pd.to_datetime(recent_spans["start"], unit="s", utc=True).dt.tz_convert(NEPAL_TZ)
+    st.dataframe(recent_spans, use_container_width=True, hide_index=True)
+
+    cols = st.columns(3)
+    cols[0].download_button("Download JSON", telemetry.to_json(recent=500), file_name="nepse-hub-telemetry.json", mime="application/json")
+    cols[1].download_button("Download Prometheus", telemetry.to_prometheus(), file_name="nepse-hub-metrics.prom", mime="text/plain")
+    if cols[2].button("Reset"):
+        telemetry.reset()
+        st.rerun()
+
+observe("page.render", (time.perf_counter() - render_started) * 1000, page=page)
+
+# The page is on screen by now: build the Gemini client in the background, once per process,
+# so the first AI answer doesn't also pay for importing the SDK
+@st.cache_resource
+def prewarm_llm_client(): warm_up_llm()
+
+prewarm_llm_client()
@@ -0,0 +1,83 @@
+import sqlite3
+import threading
+import time
+
+from settings import data_path
+
+
+class ArticleStore:
+    """
+    On-disk store of scraped article bodies keyed by article link.
+
+    Published ShareSansar articles almost never change, so once an article is in here
+    we only need the list page to find new links, plus the occasional conditional GET
+    (using the stored ETag/Last-Modified validators) to confirm an old one is unchanged.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or data_path("articles.sqlite3")
+        self._lock = threading.Lock()
+        # One connection shared by the scraper's worker threads, serialized by the lock
+        self._conn = sqlite3.connect(self.path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS articles (
+                link TEXT PRIMARY KEY,
+                content TEXT NOT NULL,
+                fetched_at REAL NOT NULL,
+                etag TEXT,
+                last_modified TEXT
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, link):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT content, fetched_at, etag, last_modified FROM articles WHERE link = ?", (link,)
+            ).fetchone()
+        if row is None:
+            return None
+        return {"content": row[0], "fetched_at": row[1], "etag": row[2], "last_modified": row[3]}
+
+    def put(self, link, content, etag=None, last_modified=None):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO articles (link, content, fetched_at, etag, last_modified) VALUES (?, ?, ?, ?, ?)",
+                (link, content, time.time(), etag, last_modified),
+            )
+            self._conn.commit()
+
+    def touch(self, link):
+        """
+        Marks a stored article as freshly validated (the server answered 304 Not Modified).
+        """
+        with self._lock:
+            self._conn.execute("UPDATE articles SET fetched_at = ? WHERE link = ?", (time.time(), link))
+            self._conn.commit()
+
+
+def conditional_headers(record):
+    """
+    Conditional request headers (If-None-Match / If-Modified-Since) for a stored article.
+    """
+    headers = {}
+    if record and record["etag"]:
+        headers["If-None-Match"] = record["etag"]
+    if record and record["last_modified"]:
+        headers["If-Modified-Since"] = record["last_modified"]
+    return headers
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_default_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = ArticleStore()
+        return _default_store
@@ -0,0 +1,199 @@
+import os
+import threading
+from datetime import datetime
+
+# scraper and analysis are imported inside the jobs that use them, on the refresh threads,
+# so importing this module stays cheap for the app
+from market_data import get_market_data
+from cache_backend import get_shared_cache, make_key
+from market_diff import briefing_basis, is_material_move
+from settings import NEPAL_TZ
+from llm_client import is_error_response
+from llm_scheduler import PRIORITY_BACKGROUND
+
+# NEPSE trades Sunday to Thursday, 11:00-15:00 Nepal time (Python weekday: Monday=0 ... Sunday=6)
+TRADING_DAYS = {6, 0, 1, 2, 3}
+MARKET_OPEN = (11, 0)
+MARKET_CLOSE = (15, 0)
+
+# Refresh intervals in seconds
+MARKET_REFRESH_OPEN = 60
+MARKET_REFRESH_CLOSED = 30 * 60
+IPO_REFRESH = 10 * 60
+# Only the newest articles of the IPO list (the ones most readers open) get an analysis
+# ahead of time; older ones are analysed when someone opens them
+PREGENERATE_IPO_ANALYSES = 5
+# A briefing or IPO analysis in the shared cache is reused by every process for this long
+REPORT_TTL = 6 * 60 * 60
+
+# Set NEPSE_HUB_BACKGROUND_REFRESH=0 to keep all work on the request path (e.g. while debugging)
+BACKGROUND_REFRESH_ENABLED = os.getenv("NEPSE_HUB_BACKGROUND_REFRESH", "1") != "0"
+
+
+def is_trading_hours(now=None):
+    now = (now or datetime.now(NEPAL_TZ)).astimezone(NEPAL_TZ)
+    if now.weekday() not in TRADING_DAYS:
+        return False
+    return MARKET_OPEN <= (now.hour, now.minute) < MARKET_CLOSE
+
+
+def is_market_open(market):
+    """
+    NEPSE's own open/close flag from a get_market_data() result, or the trading calendar when
+    the status call failed or answered something unexpected.
+    """
+    status = str((market or {}).get("status", "")).upper()
+    if status.startswith(("OPEN", "CLOSE")):
+        return status.startswith("OPEN")
+    return is_trading_hours()
+
+
+class ResultStore:
+    """
+    Last good result per key, shared between the refresh thread and page renders.
+
+    Readers always get the most recent successful value (stale-while-revalidate): a refresh
+    that is in progress or fails never removes what is already there, only clear() does.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def get(self, key, default=None):
+        with self._lock:
+            return self._values.get(key, default)
+
+    def put(self, key, value):
+        with self._lock:
+            self._values[key] = value
+
+    def clear(self):
+        with self._lock:
+            self._values.clear()
+
+
+class RefreshScheduler:
+    """
+    Daemon threads that keep market data, the IPO list and their AI reports precomputed
+    in a ResultStore, so page loads read ready-made results instead of paying for them.
+
+    Market data refreshes every minute while NEPSE is trading and every half hour otherwise;
+    the AI market briefing is regenerated after every market refresh, IPO analyses only for
+    the newest `PREGENERATE_IPO_ANALYSES` articles that don't have one yet.
+
+    Every app process runs its own refresher, so each fetch and report goes through the shared
+    cache's single-flight: per tick one process polls NEPSE, scrapes, records the snapshot and
+    writes the reports, and the others pick up its results.
+    """
+
+    def __init__(self, store=None):
+        self.store = store or ResultStore()
+        self._stop = threading.Event()
+        # set to run a job now instead of at its next tick, one per job thread
+        self._wake = {}
+        self._threads = []
+
+    def start(self):
+        # One thread per job, so a slow batch of IPO analyses never delays the market refresh
+        if not self._threads:
+            jobs = {
+                "market": (self.refresh_market, self.market_interval),
+                "ipos": (self.refresh_ipos, lambda: IPO_REFRESH),
+            }
+            for name, (job, interval) in jobs.items():
+                self._wake[name] = threading.Event()
+                thread = threading.Thread(target=self._loop, args=(name, job, interval), name=f"refresh-{name}", daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def stop(self):
+        self._stop.set()
+        self.invalidate()
+
+    def invalidate(self):
+        """
+        Drops every precomputed result and has each job run again right away (pages fall back to
+        fetching on their own until it lands).
+        """
+        self.store.clear()
+        for wake in self._wake.values():
+            wake.set()
+
+    def market_interval(self):
+        market = self.store.get("market")
+        is_open = is_trading_hours() or (market is not None and is_market_open(market))
+        return MARKET_REFRESH_OPEN if is_open else MARKET_REFRESH_CLOSED
+
+    def refresh_market(self):
+        from analysis import get_market_summary_from_data
+
+        def fetch():
+            market = get_market_data()
+            if "error" not in market:
+                # pyarrow is imported here, on this thread, rather than while the first page renders
+                from snapshot_store import record_snapshot
+                record_snapshot(market)
+            return market
+
+        # fresh for a little less than one interval, so the next tick of any process refetches
+        market = get_shared_cache().get_or_compute(
+            make_key("background_market"), fetch, max(1, self.market_interval() - 5), cache_if=lambda m: "error" not in m)
+        if "error" in market:
+            print(f"Background market refresh failed, keeping last good data: {market['error']}")
+            return
+        self.store.put("market", market)
+        # The briefing is only rewritten (one LLM call) when the market moved materially since the last one.
+        # It is keyed by what it is written from, so processes looking at the same snapshot share one.
+        if self.store.get("market_summary") is not None and not is_material_move(self.store.get("market_summary_basis"), market):
+            return
+        basis = briefing_basis(market)
+        summary = get_shared_cache().get_or_compute(
+            make_key("background_briefing", repr(basis)),
+            lambda: get_market_summary_from_data(market['gainers'], market['losers'], market['turnover'], priority=PRIORITY_BACKGROUND),
+            REPORT_TTL, cache_if=lambda text: not is_error_response(text),
+        )
+        if not is_error_response(summary):
+            self.store.put("market_summary", summary)
+            self.store.put("market_summary_basis", basis)
+
+    def refresh_ipos(self):
+        from analysis import get_in_depth_ipo_analysis
+        from scraper import scrape_upcoming_ipos
+
+        # same key as the IPO Center's cached_scrape_ipos, so pages and refreshers share one scrape
+        ipo_data = get_shared_cache().get_or_compute(
+            make_key("scrape_ipos"), scrape_upcoming_ipos, IPO_REFRESH, cache_if=lambda result: not isinstance(result, str))
+        if isinstance(ipo_data, str):
+            print(f"Background IPO refresh failed, keeping last good data: {ipo_data}")
+            return
+        self.store.put("ipos", ipo_data)
+        cache = get_shared_cache()
+        for _, row in ipo_data.head(PREGENERATE_IPO_ANALYSES).iterrows():
+            key = f"ipo_analysis:{row['link']}"
+            if self._stop.is_set() or self.store.get(key) is not None:
+                continue
+            shared_key = make_key("background_ipo_analysis", row['link'])
+            cached = cache.backend.get(shared_key)
+            if cached is not None:
+                # another process (or an earlier run of this one) already wrote it, even if stale
+                self.store.put(key, cached[0])
+                continue
+            analysis = cache.get_or_compute(
+                shared_key,
+                lambda: get_in_depth_ipo_analysis(row['title'], row['content'], priority=PRIORITY_BACKGROUND, details=row.get('details')),
+                REPORT_TTL, cache_if=lambda text: not is_error_response(text),
+            )
+            if not is_error_response(analysis):
+                self.store.put(key, analysis)
+
+    def _loop(self, name, job, interval):
+        while not self._stop.is_set():
+            try:
+                job()
+            except Exception as e:
+                print(f"Background refresh '{name}' failed: {e}")
+            wake = self._wake[name]
+            wake.wait(interval())
+            wake.clear()
@@ -0,0 +1,259 @@
+"""
+Offline stand-ins for everything the app talks to over the network, fed from the recorded
+fixtures in benchmarks/fixtures. Each one takes a latency (seconds) so a benchmark can
+measure either pure CPU cost (latency 0) or how well the code overlaps slow calls.
+
+    import fakes
+    fakes.install(nepse_latency=0.05, llm_latency=0.2)   # patches the project modules in place
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+import types
+from urllib.parse import parse_qs, urlparse
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def load_fixture(name, mode="r"):
+    with open(os.path.join(FIXTURES, name), mode, **({} if "b" in mode else {"encoding": "utf-8"})) as f:
+        return f.read()
+
+
+class FakeResponse:
+    def __init__(self, url, content, status_code=200, headers=None):
+        self.url = url
+        self.content = content
+        self.status_code = status_code
+        self.headers = headers or {}
+
+    @property
+    def text(self):
+        return self.content.decode("utf-8", errors="replace")
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            import requests
+            raise requests.exceptions.HTTPError(f"{self.status_code} for {self.url}")
+
+
+class FakeSession:
+    """
+    requests.Session replacement serving the recorded ShareSansar pages: list URLs get the
+    list page (links made unique per page number), every other URL gets the article page.
+    Articles carry an ETag, so conditional GETs from the article store are answered with 304.
+    """
+
+    ETAG = '"fixture-v1"'
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.headers = {}
+        self.requests = 0
+        self._lock = threading.Lock()
+        self._list_html = load_fixture("sharesansar_list.html", "rb")
+        self._article_html = load_fixture("sharesansar_article.html", "rb")
+
+    def mount(self, prefix, adapter):
+        pass
+
+    def get(self, url, headers=None, timeout=None):
+        with self._lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        parsed = urlparse(url)
+        if "/category/" in parsed.path:
+            page = int(parse_qs(parsed.query).get("page", ["1"])[0])
+            html = self._list_html if page == 1 else self._list_html.replace(b"/newsdetail/", f"/newsdetail/p{page}-".encode())
+            return FakeResponse(url, html)
+        if (headers or {}).get("If-None-Match") == self.ETAG:
+            return FakeResponse(url, b"", status_code=304, headers={"ETag": self.ETAG})
+        return FakeResponse(url, self._article_html, headers={"ETag": self.ETAG})
+
+
+class StubNepse:
+    """
+    Drop-in for `nepse.Nepse` answering from benchmarks/fixtures/nepse_snapshot.json (one
+    captured trading day). Price history isn't recorded, it is a seeded random walk per symbol
+    so every run sees the same numbers.
+    """
+
+    latency = 0.0
+    history_days = 260
+
+    def __init__(self):
+        self._snapshot = json.loads(load_fixture("nepse_snapshot.json"))
+
+    def setTLSVerification(self, verify):
+        pass
+
+    def _answer(self, method):
+        if self.latency:
+            time.sleep(self.latency)
+        return json.loads(json.dumps(self._snapshot[method]))
+
+    def getMarketStatus(self):
+        return self._answer("getMarketStatus")
+
+    def getTopGainers(self):
+        return self._answer("getTopGainers")
+
+    def getTopLosers(self):
+        return self._answer("getTopLosers")
+
+    def getTopTenTurnoverScrips(self):
+        return self._answer("getTopTenTurnoverScrips")
+
+    def getNepseSubIndices(self):
+        return self._answer("getNepseSubIndices")
+
+    def getNepseIndex(self):
+        return self._answer("getNepseIndex")
+
+    def getCompanyList(self):
+        return self._answer("getCompanyList")
+
+    def getCompanyDetails(self, symbol):
+        # the captured response, re-labelled with the company and priced off its price history
+        company = next((c for c in self._snapshot["getCompanyList"] if c["symbol"] == symbol), None)
+        if company is None:
+            raise ValueError(f"Company with symbol {symbol} not found")
+        details = self._answer("getCompanyDetails")
+        last, previous = self.getCompanyPriceVolumeHistory(symbol, sleep=False)["content"][:2]
+        details["security"].update(symbol=symbol, securityName=company["securityName"])
+        details["security"]["companyId"]["sectorMaster"]["sectorDescription"] = company["sectorName"]
+        details["securityDailyTradeDto"].update(
+            lastTradedPrice=last["closePrice"], closePrice=last["closePrice"], previousClose=previous["closePrice"],
+            highPrice=last["highPrice"], lowPrice=last["lowPrice"], totalTradeQuantity=last["totalTradedQuantity"],
+        )
+        return details
+
+    def getCompanyPriceVolumeHistory(self, symbol, sleep=True):
+        if self.latency and sleep:
+            time.sleep(self.latency)
+        walk = random.Random(symbol)
+        price, rows = walk.uniform(200, 2000), []
+        start = time.mktime((2024, 3, 14, 0, 0, 0, 0, 0, -1)) - self.history_days * 86400
+        for day in range(self.history_days):
+            price = max(10.0, price * (1 + walk.gauss(0, 0.02)))
+            rows.append({
+                "businessDate": time.strftime("%Y-%m-%d", time.localtime(start + day * 86400)),
+                "closePrice": round(price, 1),
+                "highPrice": round(price * (1 + walk.uniform(0, 0.03)), 1),
+                "lowPrice": round(price * (1 - walk.uniform(0, 0.03)), 1),
+                "totalTradedQuantity": walk.randint(500, 50000),
+            })
+        # newest first, paginated like the real endpoint
+        return {"content": rows[::-1], "totalElements": len(rows)}
+
+
+class _Chunk:
+    def __init__(self, text):
+        self.text = text
+
+
+FAKE_REPORT = (
+    "### 1. Key Details\n\n* **Company:** Example Hydropower Limited\n* **Units:** 1,000,000\n\n"
+    "### 2. Company Overview\n\nThe company develops a run-of-river hydropower project and sells its "
+    "output to the national grid under a long-term power purchase agreement.\n\n"
+    "### 3. Potential Risks\n\n* Construction delays and cost overruns.\n* Monsoon-dependent generation.\n"
+    "* Dilution from future right shares.\n\n"
+    "### 4. Summary\n\nA small hydropower issue at par; suitable for long-term investors who accept "
+    "sector risk. This is educational information, not investment advice.\n"
+)
+
+
+class _FakeModels:
+    def __init__(self, client):
+        self._client = client
+
+    def generate_content(self, model, contents):
+        self._client._record()
+        time.sleep(self._client.latency + self._client.chunk_latency * len(self._client.chunks()))
+        return _Chunk(FAKE_REPORT)
+
+    def generate_content_stream(self, model, contents):
+        self._client._record()
+        time.sleep(self._client.latency)
+        for chunk in self._client.chunks():
+            if self._client.chunk_latency:
+                time.sleep(self._client.chunk_latency)
+            yield _Chunk(chunk)
+
+
+class FakeGenaiClient:
+    """
+    Stands in for `google.genai.Client`: answers every prompt with the same markdown report
+    after `latency` seconds, streamed in `chunk_chars`-sized pieces `chunk_latency` apart.
+    """
+
+    def __init__(self, latency=0.0, chunk_latency=0.0, chunk_chars=40):
+        self.latency = latency
+        self.chunk_latency = chunk_latency
+        self.chunk_chars = chunk_chars
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.models = _FakeModels(self)
+
+    def _record(self):
+        with self._lock:
+            self.calls += 1
+
+    def chunks(self):
+        return [FAKE_REPORT[i:i + self.chunk_chars] for i in range(0, len(FAKE_REPORT), self.chunk_chars)]
+
+
+class FakeTranslator:
+    """
+    Stands in for deep_translator's GoogleTranslator: one `latency` per request, each line
+    comes back tagged with the target language so batches still split cleanly.
+    """
+
+    requests = 0
+    _lock = threading.Lock()
+
+    def __init__(self, lang, latency=0.0):
+        self.lang = lang
+        self.latency = latency
+
+    def translate(self, text):
+        with FakeTranslator._lock:
+            FakeTranslator.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return "\n".join(f"[{self.lang}] {line}" if line.strip() else line for line in text.split("\n"))
+
+
+def install(network_latency=0.0, nepse_latency=0.0, llm_latency=0.0, llm_chunk_latency=0.0, translate_latency=0.0):
+    """
+    Patches the project modules so nothing leaves the process. Must run after the environment
+    (NEPSE_HUB_DATA_DIR etc.) is set and before the app or the benchmarks make their first call.
+    Returns the installed fakes by name.
+    """
+    import llm_client
+    import scraper
+    import translation
+    from llm_scheduler import LLMScheduler
+    from market_data import client_manager
+
+    StubNepse.latency = nepse_latency
+    stub_module = types.ModuleType("nepse")
+    stub_module.Nepse = StubNepse
+    sys.modules["nepse"] = stub_module
+    client_manager.reset()
+
+    session = FakeSession(latency=network_latency)
+    scraper.make_session = lambda pool_size=8, headers=None: session
+
+    genai_client = FakeGenaiClient(latency=llm_latency, chunk_latency=llm_chunk_latency)
+    llm_client._client = genai_client
+    # Same shape as the real scheduler, without the Gemini free-tier quotas
+    llm_client.scheduler = LLMScheduler(max_workers=4, global_per_minute=10 ** 6, user_per_minute=10 ** 6)
+
+    translation.make_translator = lambda lang: FakeTranslator(lang, latency=translate_latency)
+
+    return {"session": session, "genai": genai_client, "scheduler": llm_client.scheduler}
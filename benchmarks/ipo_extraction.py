@@ -0,0 +1,59 @@
+"""
+Accuracy and speed of the rule-based IPO extractor over the recorded article corpus.
+
+    python benchmarks/ipo_extraction.py [--repeat 200]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ipo_extractor import extract_ipo_details  # noqa: E402
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "ipo_articles.json")
+
+
+def matches(expected, actual):
+    if isinstance(expected, float) and isinstance(actual, (int, float)):
+        return abs(expected - actual) < 0.01
+    return expected == actual
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=200, help="passes over the corpus for the timing")
+    args = parser.parse_args()
+
+    with open(CORPUS, encoding="utf-8") as f:
+        corpus = json.load(f)
+
+    correct, total, failures = {}, {}, []
+    for article in corpus:
+        details = extract_ipo_details(article["title"], article["content"])
+        for field, expected in article["expected"].items():
+            total[field] = total.get(field, 0) + 1
+            if matches(expected, details[field]):
+                correct[field] = correct.get(field, 0) + 1
+            else:
+                failures.append((article["title"], field, expected, details[field]))
+
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        for article in corpus:
+            extract_ipo_details(article["title"], article["content"])
+    per_article_ms = (time.perf_counter() - start) * 1000 / (args.repeat * len(corpus))
+
+    print(f"{len(corpus)} articles, {per_article_ms:.3f} ms per article")
+    for field in total:
+        print(f"  {field:<22} {correct.get(field, 0)}/{total[field]}")
+    overall = sum(correct.values()) / sum(total.values())
+    print(f"overall field accuracy: {overall:.1%}")
+    for title, field, expected, actual in failures:
+        print(f"  MISS {field} in {title!r}: expected {expected!r}, got {actual!r}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""
+Speed of each HTML parser backend on the recorded ShareSansar pages, checked against
+the original full-tree BeautifulSoup extraction.
+
+    python benchmarks/parsing_backends.py [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import time
+
+from bs4 import BeautifulSoup
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_parsing import BACKENDS  # noqa: E402
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+
+
+def reference_article(html):
+    node = BeautifulSoup(html, "html.parser").select_one("#newsdetail-content")
+    return node.get_text(separator="\n", strip=True) if node else None
+
+
+def reference_list(html):
+    items = []
+    for div in BeautifulSoup(html, "html.parser").find_all("div", class_="featured-news-list"):
+        title, link, date = div.find("h4", class_="featured-news-title"), div.find("a"), div.find("span", class_="text-org")
+        if title and link and date:
+            items.append({"title": title.get_text(strip=True), "date": date.get_text(strip=True), "link": link["href"]})
+    return items
+
+
+def timed(func, html, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(html)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    with open(os.path.join(FIXTURES, "sharesansar_article.html"), "rb") as f:
+        article_html = f.read()
+    with open(os.path.join(FIXTURES, "sharesansar_list.html"), "rb") as f:
+        list_html = f.read()
+
+    expected_article, expected_list = reference_article(article_html), reference_list(list_html)
+    print(f"{'backend':<22} {'article ms':>10} {'list ms':>10}  identical")
+    print(f"{'full tree (original)':<22} {timed(reference_article, article_html, args.repeat):>10.2f} "
+          f"{timed(reference_list, list_html, args.repeat):>10.2f}  -")
+
+    for name, backend_class in BACKENDS.items():
+        try:
+            backend = backend_class()
+        except ImportError:
+            print(f"{name:<22} not installed")
+            continue
+        article = lambda html: backend.text_by_id(html, "newsdetail-content")  # noqa: E731
+        identical = article(article_html) == expected_article and backend.article_list(list_html) == expected_list
+        print(f"{name:<22} {timed(article, article_html, args.repeat):>10.2f} "
+              f"{timed(backend.article_list, list_html, args.repeat):>10.2f}  {identical}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,425 @@
+"""
+Offline benchmark suite: scraping/parsing, market snapshot assembly, prompt building, the
+LLM pipeline and full page renders (Streamlit AppTest), all against the recorded fixtures
+and the fakes in benchmarks/fakes.py, so no network access or API key is needed.
+
+Results are written to benchmarks/results/<timestamp>.json; pass an earlier file with
+--compare to see what got faster or slower.
+
+    python benchmarks/run.py [--suite parsing --suite pages] [--repeat 20] [--compare benchmarks/results/baseline.json]
+"""
+import argparse
+import json
+import os
+import pickle
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+# The project reads these at import time: keep the app's local data out of the way, never start
+# the background refresher and let llm_client believe it has a key (the client itself is faked)
+os.environ["NEPSE_HUB_DATA_DIR"] = tempfile.mkdtemp(prefix="nepse-hub-bench-")
+os.environ["NEPSE_HUB_BACKGROUND_REFRESH"] = "0"
+os.environ.setdefault("GEMINI_API_KEY", "offline-benchmark")
+
+# project modules before this directory, whose scripts share some of their names
+sys.path.insert(0, ROOT)
+
+import fakes  # noqa: E402
+
+# A change is reported as a regression/improvement once its mean moves by more than this
+THRESHOLD = 0.10
+
+
+def summarize(samples):
+    samples = sorted(samples)
+    return {
+        "runs": len(samples),
+        "mean_ms": round(statistics.fmean(samples), 3),
+        "p50_ms": round(samples[len(samples) // 2], 3),
+        "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+        "min_ms": round(samples[0], 3),
+    }
+
+
+def measure(func, repeat, warmup=1, items=None):
+    """
+    Calls `func` `repeat` times after `warmup` untimed calls. `items` (work units per call,
+    e.g. articles parsed) adds a throughput figure.
+    """
+    for _ in range(warmup):
+        func()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - started) * 1000)
+    result = summarize(samples)
+    if items:
+        result["per_second"] = round(items * 1000 / result["mean_ms"], 1) if result["mean_ms"] else None
+    return result
+
+
+def bench_parsing(args):
+    from html_parsing import BACKENDS
+    from ipo_extractor import extract_ipo_details
+
+    list_html = fakes.load_fixture("sharesansar_list.html", "rb")
+    article_html = fakes.load_fixture("sharesansar_article.html", "rb")
+    results = {}
+    for name, backend_class in BACKENDS.items():
+        try:
+            backend = backend_class()
+        except ImportError:
+            continue
+        results[f"list_page[{name}]"] = measure(lambda: backend.article_list(list_html), args.repeat, items=1)
+        results[f"article_page[{name}]"] = measure(
+            lambda: backend.text_by_id(article_html, "newsdetail-content"), args.repeat, items=1)
+
+    articles = json.loads(fakes.load_fixture("ipo_articles.json"))
+    results["extract_ipo_details"] = measure(
+        lambda: [extract_ipo_details(a["title"], a["content"]) for a in articles], args.repeat, items=len(articles))
+    return results
+
+
+def bench_scrape(args):
+    import scraper
+    from article_store import ArticleStore
+    from settings import data_path
+
+    stores = iter(range(10 ** 9))
+
+    def scrape_cold():
+        # a fresh article store: every article is downloaded and parsed
+        store = ArticleStore(data_path("bench", f"articles-{next(stores)}.sqlite3"))
+        scraper.get_default_store = lambda: store
+        return scraper.scrape_upcoming_ipos(max_pages=2, requests_per_second=None)
+
+    warm_store = ArticleStore(data_path("bench", "articles-warm.sqlite3"))
+
+    def scrape_stored():
+        # every article already stored and fresh: only the list pages are fetched
+        scraper.get_default_store = lambda: warm_store
+        return scraper.scrape_upcoming_ipos(max_pages=2, requests_per_second=None)
+
+    def scrape_revalidate():
+        # every article stored but due for revalidation: conditional GETs answered with 304
+        with warm_store._lock:
+            warm_store._conn.execute("UPDATE articles SET fetched_at = 0")
+            warm_store._conn.commit()
+        return scrape_stored()
+
+    articles = len(scrape_cold())
+    return {
+        "scrape_upcoming_ipos[cold]": measure(scrape_cold, args.repeat, items=articles),
+        "scrape_upcoming_ipos[stored]": measure(scrape_stored, args.repeat, items=articles),
+        "scrape_upcoming_ipos[revalidate]": measure(scrape_revalidate, args.repeat, items=articles),
+    }
+
+
+def bench_market(args):
+    from market_data import get_all_companies, get_company_details, get_market_data, get_price_history
+    from portfolio import fetch_quotes, normalize_holdings, value_portfolio
+    from screener import PriceMatrix, active_equities, compute_indicators, load_market_indicators
+    from snapshot_store import get_snapshot_store
+
+    market = get_market_data()
+    companies = get_all_companies()
+    symbols = list(active_equities(companies))
+    histories = get_price_history(symbols)
+    store = get_snapshot_store()
+    holdings = normalize_holdings([(symbol, 10 + i, 300 + i) for i, symbol in enumerate(symbols[:50])])
+    quotes, _ = fetch_quotes(holdings["symbol"], get_company_details)
+    # what the shared cache stores and reads back on every market_data / all_companies hit
+    cached = {"market": market, "companies": companies}
+    results = {
+        "get_market_data": measure(get_market_data, args.repeat),
+        "snapshot_store.append": measure(lambda: store.append(market), args.repeat),
+        "get_price_history": measure(lambda: get_price_history(symbols), max(1, args.repeat // 4), items=len(symbols)),
+        "compute_indicators": measure(
+            lambda: compute_indicators(PriceMatrix.from_histories(histories), active_equities(companies)),
+            args.repeat, items=len(symbols)),
+        "load_market_indicators": measure(lambda: load_market_indicators(companies), max(1, args.repeat // 4), items=len(symbols)),
+        # uncached details for a 50-stock portfolio, fetched concurrently, then valued
+        "portfolio[fetch x50]": measure(lambda: fetch_quotes(holdings["symbol"], get_company_details), max(1, args.repeat // 4), items=len(holdings)),
+        "portfolio[value x50]": measure(lambda: value_portfolio(holdings, quotes), args.repeat, items=len(holdings)),
+    }
+    for name, value in cached.items():
+        frames = [v for v in (value.values() if isinstance(value, dict) else [value]) if hasattr(v, "memory_usage")]
+        results[f"cache_roundtrip[{name}]"] = measure(lambda: pickle.loads(pickle.dumps(value)), args.repeat)
+        results[f"cache_roundtrip[{name}]"].update(
+            pickled_bytes=len(pickle.dumps(value)),
+            memory_bytes=sum(int(df.memory_usage(deep=True).sum()) for df in frames),
+        )
+    return results
+
+
+def bench_prompts(args):
+    import analysis
+    from chat_memory import ChatMemory
+    from ipo_extractor import extract_ipo_details
+    from market_data import get_company_details, get_market_data
+    from prompt_context import encode_scrip_details
+    from retrieval import build_index, estimate_tokens
+
+    # Stop right before the LLM call: the client functions hand back the finished prompt
+    prompts = {}
+    real_clients = analysis.generate_response, analysis.generate_response_stream
+    analysis.generate_response = analysis.generate_response_stream = lambda prompt, **kwargs: prompt
+    try:
+        articles = json.loads(fakes.load_fixture("ipo_articles.json"))
+        article = articles[0]
+        details = extract_ipo_details(article["title"], article["content"])
+        market = get_market_data()
+        company = get_company_details("NABIL")
+        stock_context = {"type": "Stock", "symbol": "NABIL", "data": encode_scrip_details(company)}
+        # every recorded notice back to back: over the chat token budget, so passages get picked
+        long_article = "\n\n".join(a["content"] for a in articles)
+        ipo_context = {"type": "IPO", "title": article["title"], "data": long_article}
+
+        def chat_cold_index():
+            build_index.cache_clear()
+            return analysis.get_chat_response("Who is the issue manager?", context=ipo_context)
+
+        # a long session: 20 report-sized answers, older turns folded into the summary as the app does
+        memory = ChatMemory()
+        for turn in range(20):
+            memory.remember(f"Question {turn}: how does NABIL compare with its sector?", fakes.FAKE_REPORT)
+            if memory.needs_summary():
+                memory.fold(analysis.summarize_chat)
+        fold_turns = [(f"Question {turn}?", fakes.FAKE_REPORT) for turn in range(memory.batch_turns)]
+
+        builders = {
+            "ipo_analysis[full]": lambda: analysis.get_in_depth_ipo_analysis(article["title"], article["content"]),
+            "ipo_analysis[narrative]": lambda: analysis.get_in_depth_ipo_analysis(article["title"], article["content"], details=details),
+            "scrip_analysis": lambda: analysis.analyze_scrip_details(company, indicators={"rsi_14": 55.1, "sma_50": 610.2}),
+            "market_summary": lambda: analysis.get_market_summary_from_data(market["gainers"], market["losers"], market["turnover"]),
+            "chat[ipo context]": lambda: analysis.get_chat_response("Who is the issue manager?", context=ipo_context),
+            "chat[ipo context, new index]": chat_cold_index,
+            "chat[stock context]": lambda: analysis.get_chat_response("What is the 52 week high?", context=stock_context),
+            "chat[no context]": lambda: analysis.get_chat_response("What is a DEMAT account?"),
+            "chat[stock context, 20 turns]": lambda: analysis.get_chat_response(
+                "And its 52 week low?", context=stock_context, history=memory.history()),
+            "chat_summary[fold]": lambda: analysis.summarize_chat(memory.summary, fold_turns),
+        }
+        results = {}
+        for name, build in builders.items():
+            results[name] = measure(build, args.repeat)
+            prompts[name] = build()
+            results[name]["prompt_chars"] = len(prompts[name])
+            results[name]["prompt_tokens"] = estimate_tokens(prompts[name])
+        return results
+    finally:
+        analysis.generate_response, analysis.generate_response_stream = real_clients
+
+
+def bench_llm(args):
+    from concurrent.futures import ThreadPoolExecutor
+
+    import llm_client
+
+    batch = 16
+    runs = iter(range(10 ** 9))
+
+    def uncached_batch():
+        # distinct prompts, so every one is a real (fake) Gemini call through the scheduler
+        run = next(runs)
+        with ThreadPoolExecutor(max_workers=batch) as pool:
+            list(pool.map(lambda i: llm_client.generate_response(f"bench {run} {i}", cache_ttl=0), range(batch)))
+
+    def coalesced_batch():
+        # the same prompt from every thread: one call, everyone shares the answer
+        run = next(runs)
+        with ThreadPoolExecutor(max_workers=batch) as pool:
+            list(pool.map(lambda i: llm_client.generate_response(f"bench shared {run}", cache_ttl=0), range(batch)))
+
+    llm_client.generate_response("bench cached", cache_ttl=60)
+    first_chunk = []
+
+    def stream():
+        started = time.perf_counter()
+        chunks = llm_client.generate_response_stream(f"bench stream {next(runs)}", cache_ttl=0)
+        next(chunks)
+        first_chunk.append((time.perf_counter() - started) * 1000)
+        for _ in chunks:
+            pass
+
+    def coalesced_streams():
+        # identical streamed prompts (two sessions opening the same IPO): one stream, read by all
+        run = next(runs)
+        with ThreadPoolExecutor(max_workers=batch) as pool:
+            list(pool.map(lambda i: "".join(llm_client.generate_response_stream(f"bench shared stream {run}", cache_ttl=0)), range(batch)))
+
+    results = {
+        "generate_response[uncached x16]": measure(uncached_batch, max(1, args.repeat // 4), items=batch),
+        "generate_response[coalesced x16]": measure(coalesced_batch, max(1, args.repeat // 4), items=batch),
+        "generate_response[cache hit]": measure(lambda: llm_client.generate_response("bench cached", cache_ttl=60), args.repeat),
+        "generate_response_stream": measure(stream, max(1, args.repeat // 4)),
+        "generate_response_stream[coalesced x16]": measure(coalesced_streams, max(1, args.repeat // 4), items=batch),
+    }
+    results["generate_response_stream"]["first_chunk_ms"] = round(statistics.fmean(first_chunk), 3)
+    return results
+
+
+# (page, language, extra steps run on the AppTest before the timed rerun)
+PAGE_CASES = [
+    ("Market Overview", "English", None),
+    ("Market Overview", "नेपाली", None),
+    ("IPO Center", "English", None),
+    ("Stock Analysis", "English", lambda at: at.text_input[0].set_value("NABIL")),
+    ("Stock Screener", "English", None),
+    ("Portfolio", "English", lambda at: seed_holdings(at)),
+    ("AI Chat Assistant", "English", lambda at: at.chat_input[0].set_value("How did the banks do today?")),
+]
+
+
+def seed_holdings(at):
+    # the editor can't be typed into from AppTest, so the holdings it starts from are set directly
+    import pandas as pd
+
+    symbols = ["NABIL", "NICA", "CHCL", "NLIC", "HDL", "SHIVM", "GBIME", "UPPER"]
+    holdings = pd.DataFrame({
+        "symbol": pd.Series(symbols, dtype="string"),
+        "quantity": [10.0 * (i + 1) for i in range(len(symbols))],
+        "avg_cost": [300.0 + 50 * i for i in range(len(symbols))],
+    })
+    at.session_state["holdings"] = at.session_state["saved_holdings"] = holdings
+
+
+def bench_pages(args):
+    from streamlit.testing.v1 import AppTest
+
+    from cache_backend import get_shared_cache
+    from llm_client import response_cache
+
+    def render(page, language, step, cold):
+        # get to the page first, then time one rerun of it (after the step, e.g. a search)
+        at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+        at.run()
+        if language != "English":
+            at.sidebar.selectbox[0].set_value(language).run()
+        if page != "Market Overview":
+            # the options are the English page names whatever the language, only labels are translated
+            at.sidebar.radio(key="page").set_value(page).run()
+        if step:
+            step(at)
+        if cold:
+            get_shared_cache().clear()
+            response_cache.clear()
+        started = time.perf_counter()
+        at.run()
+        elapsed = (time.perf_counter() - started) * 1000
+        if at.exception:
+            raise RuntimeError(f"{page} raised: {at.exception[0].value}")
+        return elapsed
+
+    results = {}
+    for page, language, step in PAGE_CASES:
+        name = page if language == "English" else f"{page} [{language}]"
+        cold, warm = [], []
+        for _ in range(max(1, args.repeat // 10)):
+            cold.append(render(page, language, step, cold=True))
+            warm.append(render(page, language, step, cold=False))
+        results[f"{name} [cold]"] = summarize(cold)
+        results[f"{name} [warm]"] = summarize(warm)
+    return results
+
+
+SUITES = {
+    "parsing": bench_parsing,
+    "scrape": bench_scrape,
+    "market": bench_market,
+    "prompts": bench_prompts,
+    "llm": bench_llm,
+    "pages": bench_pages,
+}
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True).stdout.strip()
+    except OSError:
+        return None
+
+
+def compare(results, baseline):
+    print(f"\nCompared with {baseline['meta'].get('commit')} ({baseline['meta'].get('timestamp')}):")
+    print(f"{'case':<58} {'before':>10} {'after':>10} {'change':>8}")
+    for suite, cases in results["suites"].items():
+        for case, stats in cases.items():
+            before = baseline["suites"].get(suite, {}).get(case)
+            if not before or not before.get("mean_ms"):
+                continue
+            change = stats["mean_ms"] / before["mean_ms"] - 1
+            flag = "  slower" if change > THRESHOLD else "  faster" if change < -THRESHOLD else ""
+            print(f"{suite + '.' + case:<58} {before['mean_ms']:>10.2f} {stats['mean_ms']:>10.2f} {change:>+8.0%}{flag}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--suite", action="append", choices=list(SUITES), help="run only these suites (repeatable)")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--network-latency", type=float, default=0.0, help="seconds per ShareSansar request")
+    parser.add_argument("--nepse-latency", type=float, default=0.0, help="seconds per NEPSE API call")
+    parser.add_argument("--llm-latency", type=float, default=0.2, help="seconds before the first LLM chunk")
+    parser.add_argument("--llm-chunk-latency", type=float, default=0.01, help="seconds between streamed chunks")
+    parser.add_argument("--translate-latency", type=float, default=0.05, help="seconds per translation request")
+    parser.add_argument("--output", help="where to write the results (default: benchmarks/results/<timestamp>.json)")
+    parser.add_argument("--compare", help="earlier results file to compare against")
+    args = parser.parse_args()
+
+    latencies = {
+        "network_latency": args.network_latency,
+        "nepse_latency": args.nepse_latency,
+        "llm_latency": args.llm_latency,
+        "llm_chunk_latency": args.llm_chunk_latency,
+        "translate_latency": args.translate_latency,
+    }
+    fakes.install(**latencies)
+
+    from html_parsing import get_html_backend
+    from telemetry import telemetry
+
+    timestamp = datetime.now(timezone.utc)
+    results = {
+        "meta": {
+            "timestamp": timestamp.isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "html_backend": get_html_backend().name,
+            "repeat": args.repeat,
+            "latencies": latencies,
+        },
+        "suites": {},
+    }
+    for name in args.suite or SUITES:
+        print(f"== {name}")
+        results["suites"][name] = SUITES[name](args)
+        for case, stats in results["suites"][name].items():
+            rate = f"  {stats['per_second']:>9.1f}/s" if stats.get("per_second") else ""
+            if stats.get("pickled_bytes"):
+                rate += f"  {stats['pickled_bytes'] / 1024:.1f} KiB pickled, {stats['memory_bytes'] / 1024:.1f} KiB in memory"
+            print(f"  {case:<48} {stats['mean_ms']:>10.3f} ms  p95 {stats['p95_ms']:>9.3f} ms{rate}")
+    results["telemetry"] = {"hit_ratios": telemetry.hit_ratios()}
+
+    output = args.output or os.path.join(RESULTS_DIR, f"{timestamp:%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+    print(f"\nSaved {output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            compare(results, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""
+Cold-start import report for app.py.
+
+Reads the module-level imports of app.py (what every worker pays at startup) and the imports
+done inside each `if page == ...` branch and cached function (what a page pays on first use),
+then times them in a fresh interpreter with `python -X importtime`.
+
+    python benchmarks/startup.py [--top 8] [--json results.json]
+"""
+import argparse
+import ast
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+APP = os.path.join(ROOT, "app.py")
+MARKER = "--- startup done ---"
+
+# Imports that happen inside library code on first use rather than in app.py
+FIRST_USE = {
+    "first AI answer (llm_client.get_client)": "from google import genai",
+    "first network translation (translation.make_translator)": "from deep_translator import GoogleTranslator",
+    "first list/article parse (html_parsing)": "from html_parsing import get_html_backend\nget_html_backend()",
+}
+
+
+def _import_source(nodes):
+    return "\n".join(ast.unparse(node) for node in nodes if isinstance(node, (ast.Import, ast.ImportFrom)))
+
+
+def _page_name(test):
+    # `page == "Market Overview"`
+    if isinstance(test, ast.Compare) and isinstance(test.left, ast.Name) and test.left.id == "page":
+        comparator = test.comparators[0]
+        if isinstance(comparator, ast.Constant):
+            return comparator.value
+    return None
+
+
+def app_import_groups(path=APP):
+    """
+    {"startup": source, "<page or function name>": source} of the import statements in app.py.
+    """
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+
+    groups = {"startup": _import_source(tree.body)}
+    deferred = {}
+    for node in tree.body:
+        branch = node
+        while isinstance(branch, ast.If):
+            name = _page_name(branch.test)
+            if name:
+                deferred[name] = _import_source(ast.walk(ast.Module(body=branch.body, type_ignores=[])))
+            branch = branch.orelse[0] if len(branch.orelse) == 1 else None
+        if isinstance(node, ast.FunctionDef):
+            source = _import_source(ast.walk(node))
+            if source:
+                deferred[f"{node.name}()"] = source
+    groups.update({name: source for name, source in deferred.items() if source})
+    groups.update(FIRST_USE)
+    return groups
+
+
+def parse_importtime(stderr):
+    """
+    Top-level entries of `-X importtime` output as [(module, cumulative_ms)], in import order.
+    """
+    entries = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        # nested imports are indented under the module that triggered them
+        if not name[1:].startswith(" "):
+            entries.append((name.strip(), int(cumulative) / 1000))
+    return entries
+
+
+def time_group(source, preamble=""):
+    """
+    Runs `preamble` and then times `source` in a fresh interpreter. Returns the top-level
+    modules `source` imported, slowest first, and their total in milliseconds.
+    """
+    code = f"{preamble}\nimport sys\nsys.stderr.write({MARKER!r} + '\\n')\n{source}"
+    env = dict(os.environ, NEPSE_HUB_BACKGROUND_REFRESH="0")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=ROOT, env=env, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    modules = sorted(parse_importtime(result.stderr.split(MARKER, 1)[1]), key=lambda entry: -entry[1])
+    return modules, sum(ms for _, ms in modules)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--top", type=int, default=8, help="slowest modules listed per group")
+    parser.add_argument("--json", help="also write the report to this file")
+    args = parser.parse_args()
+
+    groups = app_import_groups()
+    report = {}
+    for name, source in groups.items():
+        try:
+            modules, total = time_group(source, preamble="" if name == "startup" else groups["startup"])
+        except RuntimeError as e:
+            print(f"{name}: failed ({e})")
+            continue
+        report[name] = {"total_ms": round(total, 1), "modules": [{"module": m, "ms": round(ms, 1)} for m, ms in modules]}
+        print(f"{name}: {total:.0f} ms")
+        for module, ms in modules[:args.top]:
+            print(f"    {module:<32} {ms:8.1f} ms")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+import contextlib
+import functools
+import hashlib
+import os
+import pickle
+import sqlite3
+import threading
+import time
+import uuid
+
+from settings import data_path
+from telemetry import count
+
+# "redis://host:6379/0" to share the cache between replicas, anything else means local SQLite
+CACHE_URL = os.getenv("NEPSE_HUB_CACHE_URL", "")
+
+# How long a recompute may hold a key's lock before others assume it died
+LOCK_LEASE = 120
+# How long a caller with nothing to serve waits for someone else's recompute
+WAIT_TIMEOUT = 60
+POLL_INTERVAL = 0.1
+
+# Deletes a Redis lock only if it is still ours, in one step: a lock whose lease ran out may
+# already belong to another replica by the time we release it
+REDIS_RELEASE_SCRIPT = """
+if redis.call("get", KEYS[1]) == ARGV[1] then
+    return redis.call("del", KEYS[1])
+end
+return 0
+"""
+
+
+class SQLiteBackend:
+    """
+    Cache shared by every process on this machine (all Streamlit workers of one host).
+    Values are pickled; locks are rows with a lease so a crashed worker can't block a key forever.
+    """
+
+    def __init__(self, path=None):
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or data_path("shared_cache.sqlite3"), check_same_thread=False, timeout=30)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS cache (key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL NOT NULL, stale_until REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE TABLE IF NOT EXISTS locks (key TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)")
+        self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute("SELECT value, expires_at, stale_until FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or row[2] <= time.time():
+            return None
+        return pickle.loads(row[0]), row[1]
+
+    def set(self, key, value, ttl, stale_ttl):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, stale_until) VALUES (?, ?, ?, ?)",
+                (key, pickle.dumps(value), now + ttl, now + ttl + stale_ttl),
+            )
+            self._conn.execute("DELETE FROM cache WHERE stale_until <= ?", (now,))
+            self._conn.commit()
+
+    def acquire(self, key, owner, lease):
+        now = time.time()
+        with self._lock:
+            self._conn.execute("DELETE FROM locks WHERE key = ? AND expires_at <= ?", (key, now))
+            cursor = self._conn.execute("INSERT OR IGNORE INTO locks (key, owner, expires_at) VALUES (?, ?, ?)", (key, owner, now + lease))
+            self._conn.commit()
+            return cursor.rowcount == 1
+
+    def release(self, key, owner):
+        with self._lock:
+            self._conn.execute("DELETE FROM locks WHERE key = ? AND owner = ?", (key, owner))
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+
+class RedisBackend:
+    """
+    Cache shared by every replica behind the load balancer. Needs the optional `redis` package.
+    """
+
+    def __init__(self, url, client=None, prefix="nepse-hub:"):
+        if client is None:
+            try:
+                import redis
+            except ImportError as e:
+                raise ImportError("NEPSE_HUB_CACHE_URL points at Redis but the 'redis' package is not installed.") from e
+            client = redis.Redis.from_url(url)
+        self._client = client
+        self._prefix = prefix
+
+    def get(self, key):
+        raw = self._client.get(self._prefix + key)
+        if raw is None:
+            return None
+        value, expires_at = pickle.loads(raw)
+        return value, expires_at
+
+    def set(self, key, value, ttl, stale_ttl):
+        # Redis drops the key once the stale window is over, freshness is tracked in the payload
+        payload = pickle.dumps((value, time.time() + ttl))
+        self._client.set(self._prefix + key, payload, px=int((ttl + stale_ttl) * 1000))
+
+    def acquire(self, key, owner, lease):
+        return bool(self._client.set(f"{self._prefix}lock:{key}", owner, nx=True, px=int(lease * 1000)))
+
+    def release(self, key, owner):
+        self._client.eval(REDIS_RELEASE_SCRIPT, 1, f"{self._prefix}lock:{key}", owner)
+
+    def clear(self):
+        for key in self._client.scan_iter(f"{self._prefix}*"):
+            self._client.delete(key)
+
+
+class SharedCache:
+    """
+    Cross-process cache with single-flight recomputation.
+
+    A fresh entry is returned straight away. When it has expired, exactly one caller
+    (across threads, processes and replicas, via the backend lock) recomputes it; everyone
+    else gets the stale value if there is one, or waits for the recompute to land.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+
+    def get_or_compute(self, key, compute, ttl, stale_ttl=None, cache_if=None):
+        stale_ttl = ttl if stale_ttl is None else stale_ttl
+        entry = self.backend.get(key)
+        if entry and entry[1] > time.time():
+            self.hits += 1
+            count("shared_cache", result="hit")
+            return entry[0]
+
+        owner = uuid.uuid4().hex
+        deadline = time.time() + WAIT_TIMEOUT
+        while not self.backend.acquire(key, owner, LOCK_LEASE):
+            # Someone else is already recomputing this key
+            if entry:
+                self.stale_hits += 1
+                count("shared_cache", result="stale")
+                return entry[0]
+            time.sleep(POLL_INTERVAL)
+            entry = self.backend.get(key)
+            if entry and entry[1] > time.time():
+                self.hits += 1
+                return entry[0]
+            if time.time() > deadline:
+                # The other worker is stuck, don't leave this user hanging
+                return compute()
+
+        try:
+            self.misses += 1
+            count("shared_cache", result="miss")
+            value = compute()
+            if cache_if is None or cache_if(value):
+                self.backend.set(key, value, ttl, stale_ttl)
+            return value
+        finally:
+            self.backend.release(key, owner)
+
+    @contextlib.contextmanager
+    def hold(self, key, lease=LOCK_LEASE, timeout=WAIT_TIMEOUT):
+        """
+        Cross-process mutex on `key`, for work that must not run twice at once. Yields True once
+        held, or False if another holder kept it for `timeout` seconds (0: don't wait).
+        """
+        owner = uuid.uuid4().hex
+        deadline = time.time() + timeout
+        acquired = self.backend.acquire(key, owner, lease)
+        while not acquired and time.time() < deadline:
+            time.sleep(POLL_INTERVAL)
+            acquired = self.backend.acquire(key, owner, lease)
+        try:
+            yield acquired
+        finally:
+            if acquired:
+                self.backend.release(key, owner)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return {"hits": self.hits, "stale_hits": self.stale_hits, "misses": self.misses}
+
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+
+def get_shared_cache():
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            if CACHE_URL.startswith(("redis://", "rediss://")):
+                backend = RedisBackend(CACHE_URL)
+            else:
+                backend = SQLiteBackend()
+            _shared_cache = SharedCache(backend)
+        return _shared_cache
+
+
+def make_key(namespace, *args):
+    return f"{namespace}:{hashlib.sha256(repr(args).encode('utf-8')).hexdigest()}"
+
+
+def shared_cached(namespace, ttl, stale_ttl=None, cache_if=None):
+    """
+    Decorator version of SharedCache.get_or_compute, keyed by namespace and call arguments.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args):
+            return get_shared_cache().get_or_compute(
+                make_key(namespace, *args), lambda: func(*args), ttl, stale_ttl=stale_ttl, cache_if=cache_if
+            )
+        return wrapper
+    return decorator
@@ -0,0 +1,109 @@
+from prompt_context import trim_to_budget
+from retrieval import estimate_tokens
+
+# Question/answer turns sent word for word with every chat question
+RECENT_TURNS = 4
+# Turns older than that are folded into the rolling summary in batches of this many
+# (one summary call per batch, not one per question)
+SUMMARY_BATCH_TURNS = 3
+# Max tokens of conversation history sent with a question, the summary included...
+HISTORY_TOKEN_BUDGET = 900
+# ...of which the summary takes at most this much
+SUMMARY_TOKEN_BUDGET = 250
+# A single long answer (a full report) is cut to this size inside the history
+MESSAGE_TOKEN_BUDGET = 300
+# Messages kept for display; the oldest are dropped beyond this
+MAX_MESSAGES = 200
+# Messages drawn per "page" of the chat, newest first
+PAGE_SIZE = 10
+
+
+def format_turn(question, answer):
+    return (f"User: {trim_to_budget(question, MESSAGE_TOKEN_BUDGET)}\n"
+            f"Assistant: {trim_to_budget(answer, MESSAGE_TOKEN_BUDGET)}")
+
+
+class ChatMemory:
+    """
+    Bounded memory of one chat session.
+
+    `messages` is what the chat page shows (capped at `max_messages`, drawn a page at a time).
+    What the model sees is kept apart: the last `recent_turns` question/answer turns word for
+    word, and a rolling summary of everything before them. Turns that leave the verbatim window
+    are folded into the summary `batch_turns` at a time, each fold building on the previous
+    summary, so a long session costs one small summary call every few questions and a
+    history of at most `HISTORY_TOKEN_BUDGET` tokens per question.
+    """
+
+    def __init__(self, recent_turns=RECENT_TURNS, batch_turns=SUMMARY_BATCH_TURNS, max_messages=MAX_MESSAGES):
+        self.recent_turns = recent_turns
+        self.batch_turns = batch_turns
+        self.max_messages = max_messages
+        self.messages = []
+        self.summary = ""
+        # [(question, answer)] not folded into the summary yet, oldest first
+        self._turns = []
+
+    def add_message(self, role, content):
+        self.messages.append({"role": role, "content": content})
+        if len(self.messages) > self.max_messages:
+            del self.messages[:len(self.messages) - self.max_messages]
+
+    def remember(self, question, answer):
+        """
+        Records a finished turn for later prompts (the English answer, not the translation shown).
+        """
+        self._turns.append((question, answer))
+        # if summaries keep failing (no quota), forget the oldest turns rather than grow without bound
+        overflow = len(self._turns) - self.recent_turns - 3 * self.batch_turns
+        if overflow > 0:
+            del self._turns[:overflow]
+
+    def pending(self):
+        """
+        Turns that left the verbatim window and wait to be folded into the summary.
+        """
+        return self._turns[:max(0, len(self._turns) - self.recent_turns)]
+
+    def needs_summary(self):
+        return len(self.pending()) >= self.batch_turns
+
+    def fold(self, summarize):
+        """
+        Folds the pending turns into the summary with `summarize(summary, turns)`, which returns
+        the new summary or None if it failed (the turns then stay pending for the next try).
+        """
+        turns = self.pending()
+        if not turns:
+            return False
+        summary = summarize(self.summary, turns)
+        if not summary:
+            return False
+        self.summary = trim_to_budget(summary.strip(), SUMMARY_TOKEN_BUDGET)
+        del self._turns[:len(turns)]
+        return True
+
+    def history(self, token_budget=HISTORY_TOKEN_BUDGET):
+        """
+        Conversation so far as prompt text: the summary, then as many of the newest turns as
+        fit in what is left of `token_budget`. Empty for a new conversation.
+        """
+        parts, remaining = [], token_budget
+        if self.summary:
+            parts.append(f"Summary of the earlier conversation:\n{self.summary}")
+            remaining -= estimate_tokens(parts[0])
+        recent = []
+        for question, answer in reversed(self._turns):
+            turn = format_turn(question, answer)
+            remaining -= estimate_tokens(turn)
+            if remaining < 0:
+                break
+            recent.append(turn)
+        return "\n\n".join(parts + recent[::-1])
+
+    def page(self, pages, page_size=PAGE_SIZE):
+        """
+        The newest `pages * page_size` messages, oldest first, and whether older ones exist.
+        """
+        start = max(0, len(self.messages) - pages * page_size)
+        return self.messages[start:], start > 0
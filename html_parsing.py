@@ -0,0 +1,184 @@
+import os
+
+# "selectolax", "lxml" or "html.parser" to force a backend, anything else picks the fastest installed
+HTML_PARSER = os.getenv("NEPSE_HUB_HTML_PARSER", "auto")
+
+# Text inside these never shows up in BeautifulSoup's get_text(), the fast backends skip it too
+NON_TEXT_TAGS = {"script", "style", "template"}
+
+LIST_ITEM_CLASS = "featured-news-list"
+LIST_TITLE_CLASS = "featured-news-title"
+LIST_DATE_CLASS = "text-org"
+
+
+def join_text(strings, separator=""):
+    # Same rules as BeautifulSoup's get_text(separator, strip=True)
+    return separator.join(s for s in (s.strip() for s in strings) if s)
+
+
+def decode(html):
+    if isinstance(html, bytes):
+        return html.decode("utf-8", errors="replace")
+    return html
+
+
+def _has_class(class_attr, name):
+    return name in (class_attr or "").split()
+
+
+def _is_list_item(class_attr):
+    # While parsing, SoupStrainer sees the raw attribute ("row featured-news-list"), not split classes
+    return class_attr is not None and LIST_ITEM_CLASS in (class_attr.split() if isinstance(class_attr, str) else class_attr)
+
+
+class SoupBackend:
+    """
+    Pure-Python fallback. Only the subtrees we read are built (SoupStrainer), the rest of
+    the page (navigation, ads, footer) is skipped while parsing.
+    """
+
+    name = "html.parser"
+
+    def __init__(self):
+        from bs4 import BeautifulSoup, SoupStrainer
+        self._soup = BeautifulSoup
+        self._strainer = SoupStrainer
+
+    def text_by_id(self, html, element_id, separator="\n"):
+        soup = self._soup(html, "html.parser", parse_only=self._strainer(id=element_id))
+        node = soup.find(id=element_id)
+        return node.get_text(separator=separator, strip=True) if node else None
+
+    def article_list(self, html):
+        soup = self._soup(html, "html.parser", parse_only=self._strainer("div", class_=_is_list_item))
+        items = []
+        for item in soup.find_all("div", class_=LIST_ITEM_CLASS):
+            title = item.find("h4", class_=LIST_TITLE_CLASS)
+            link = item.find("a")
+            date = item.find("span", class_=LIST_DATE_CLASS)
+            if title and link and date and link.get("href"):
+                items.append({"title": title.get_text(strip=True), "date": date.get_text(strip=True), "link": link["href"]})
+        return items
+
+
+class SelectolaxBackend:
+    """
+    Lexbor (C) parser via the optional `selectolax` package, the fastest option.
+    """
+
+    name = "selectolax"
+
+    def __init__(self):
+        from selectolax.lexbor import LexborHTMLParser
+        self._parser = LexborHTMLParser
+
+    def _strings(self, node):
+        for child in node.iter(include_text=True):
+            if child.tag == "-text":
+                yield child.text_content or ""
+            elif not child.tag.startswith(("-", "_")) and child.tag not in NON_TEXT_TAGS:
+                yield from self._strings(child)
+
+    def text_by_id(self, html, element_id, separator="\n"):
+        node = self._parser(decode(html)).css_first(f'[id="{element_id}"]')
+        return join_text(self._strings(node), separator) if node else None
+
+    def article_list(self, html):
+        items = []
+        for item in self._parser(decode(html)).css(f"div.{LIST_ITEM_CLASS}"):
+            title = item.css_first(f"h4.{LIST_TITLE_CLASS}")
+            link = item.css_first("a")
+            date = item.css_first(f"span.{LIST_DATE_CLASS}")
+            if title and link and date and link.attributes.get("href"):
+                items.append({
+                    "title": join_text(self._strings(title)),
+                    "date": join_text(self._strings(date)),
+                    "link": link.attributes["href"],
+                })
+        return items
+
+
+class LxmlBackend:
+    """
+    libxml2 (C) parser via the optional `lxml` package.
+    """
+
+    name = "lxml"
+
+    def __init__(self):
+        import lxml.html
+        self._html = lxml.html
+
+    def _strings(self, node):
+        # An element's own text, then every child's text and the text that trails it
+        if node.text:
+            yield node.text
+        for child in node:
+            if isinstance(child.tag, str) and child.tag not in NON_TEXT_TAGS:
+                yield from self._strings(child)
+            if child.tail:
+                yield child.tail
+
+    def _first(self, node, tag, css_class=None):
+        for candidate in node.iterdescendants(tag):
+            if css_class is None or _has_class(candidate.get("class"), css_class):
+                return candidate
+        return None
+
+    def _document(self, html):
+        # lxml refuses empty documents, treat them as pages without the element
+        html = decode(html)
+        return self._html.document_fromstring(html) if html.strip() else None
+
+    def text_by_id(self, html, element_id, separator="\n"):
+        document = self._document(html)
+        nodes = document.xpath("//*[@id=$id]", id=element_id) if document is not None else []
+        return join_text(self._strings(nodes[0]), separator) if nodes else None
+
+    def article_list(self, html):
+        document = self._document(html)
+        if document is None:
+            return []
+        items = []
+        for item in document.iter("div"):
+            if not _has_class(item.get("class"), LIST_ITEM_CLASS):
+                continue
+            title = self._first(item, "h4", LIST_TITLE_CLASS)
+            link = self._first(item, "a")
+            date = self._first(item, "span", LIST_DATE_CLASS)
+            if title is not None and link is not None and date is not None and link.get("href"):
+                items.append({
+                    "title": join_text(self._strings(title)),
+                    "date": join_text(self._strings(date)),
+                    "link": link.get("href"),
+                })
+        return items
+
+
+BACKENDS = {"selectolax": SelectolaxBackend, "lxml": LxmlBackend, "html.parser": SoupBackend}
+
+_backend = None
+
+
+def get_html_backend(name=None):
+    """
+    The configured (or fastest installed) parser backend. C-backed parsers are optional
+    dependencies; without them this falls back to BeautifulSoup's html.parser.
+    """
+    global _backend
+    if name is None and _backend is not None:
+        return _backend
+
+    preferred = name or HTML_PARSER
+    order = [preferred] if preferred in BACKENDS else []
+    order += [candidate for candidate in BACKENDS if candidate not in order]
+    for candidate in order:
+        try:
+            backend = BACKENDS[candidate]()
+            break
+        except ImportError:
+            continue
+
+    if name is None:
+        _backend = backend
+    return backend
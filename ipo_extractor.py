@@ -0,0 +1,338 @@
+import re
+
+# ShareSansar IPO announcements follow a handful of sentence templates ("X is going to issue
+# N units ... starting from <date>", "The issue manager is Y", "... net worth per share of Rs. Z"),
+# so the key facts can be read off with regexes instead of asking the LLM every time.
+
+NEPALI_MONTHS = (
+    "Baisakh|Baishakh|Jestha|Jeth|Ashadh|Ashad|Asar|Asadh|Shrawan|Saun|Sawan|Bhadra|Bhadau|Ashwin|Asoj|"
+    "Kartik|Mangsir|Mangshir|Poush|Push|Magh|Falgun|Fagun|Chaitra|Chait"
+)
+ENGLISH_MONTHS = "January|February|March|April|May|June|July|August|September|October|November|December"
+
+DATE_RE = re.compile(
+    rf"\b(?:{NEPALI_MONTHS}|{ENGLISH_MONTHS})\s+\d{{1,2}}(?:st|nd|rd|th)?(?:,?\s+\d{{4}})?",
+    re.IGNORECASE,
+)
+UNITS_RE = re.compile(r"(\d[\d,]*(?:\.\d+)?)\s*(?:units|kitta|shares)\b", re.IGNORECASE)
+RUPEES_RE = re.compile(r"(?:Rs\.?|NPR)\s*(\d[\d,]*(?:\.\d+)?)\s*(arba|crores?|lakhs?|million|billion)?", re.IGNORECASE)
+ORG_RE = re.compile(r"((?:[A-Z][\w&'.-]*\s+)+?(?:Limited|Ltd\.?))")
+QUOTED_RE = re.compile(r"[\"'‘“]([^\"'’”]{2,40})[\"'’”]")
+RATING_RE = re.compile(
+    r"(CARE-NP\s*[A-D]{1,3}[+-]?(?:\s*\((?:Is|IPO)\))?|\[?ICRA\s?NP(?:-IR)?\]?\s*(?:IPO\s+Grade\s+\d|L?[A-D]{1,3}[+-]?)|IPO\s+Grade\s+\d)",
+    re.IGNORECASE,
+)
+NWPS_RE = re.compile(r"net\s*-?\s*worth\s+per\s+share|\bNWPS\b", re.IGNORECASE)
+ISSUE_AMOUNT_RE = re.compile(r"(?<!net )\b(worth|amounting to|totaling|totalling)\b", re.IGNORECASE)
+DATE_CUE_RE = re.compile(
+    r"\b(starting from|starting|from|opens?|opening|extended to|extended|late closing|latest|"
+    r"early closing|closing|closes?|closed|till|until|ends)\b",
+    re.IGNORECASE,
+)
+SENTENCE_RE = re.compile(r"(?<=[.!?])\s+(?=[A-Z\"'“])")
+
+MULTIPLIERS = {"arba": 1e9, "crore": 1e7, "crores": 1e7, "lakh": 1e5, "lakhs": 1e5, "million": 1e6, "billion": 1e9}
+
+# News about an IPO that is not a new offer to apply for
+NOT_AN_OFFER_RE = re.compile(
+    r"\b(allot(?:ment|ted)|result|refund|auction|right shares?|dividend|listed|listing|extends?|extended|"
+    r"postpone[sd]?|cancel(?:s|led)?|oversubscribed|subscribed\s+\d)",
+    re.IGNORECASE,
+)
+OFFER_RE = re.compile(r"\b(IPO|FPO|initial public offering|further public offering|fund)\b", re.IGNORECASE)
+
+# Opening day range as a multiple of net worth per share, the rule quoted in our prompts
+OPENING_RANGE_MULTIPLES = (1, 3)
+
+CARE_GRADES = {
+    "AAA": "highest degree of safety regarding timely servicing of financial obligations",
+    "AA": "high degree of safety regarding timely servicing of financial obligations",
+    "A": "adequate degree of safety regarding timely servicing of financial obligations",
+    "BBB": "moderate degree of safety regarding timely servicing of financial obligations",
+    "BB": "moderate risk of default",
+    "B": "high risk of default",
+    "C": "very high risk of default",
+    "D": "in default or expected to default soon",
+}
+IPO_GRADES = {
+    "5": "strong fundamentals",
+    "4": "above average fundamentals",
+    "3": "average fundamentals",
+    "2": "below average fundamentals",
+    "1": "poor fundamentals",
+}
+
+
+def split_sentences(text):
+    sentences = []
+    for line in text.splitlines():
+        sentences.extend(s.strip() for s in SENTENCE_RE.split(line) if s.strip())
+    return sentences
+
+
+def parse_number(text):
+    return float(text.replace(",", ""))
+
+
+def parse_rupees(match):
+    value = parse_number(match.group(1))
+    unit = (match.group(2) or "").lower()
+    return value * MULTIPLIERS.get(unit, 1)
+
+
+def format_rupees(amount):
+    if amount >= 1e7:
+        return f"Rs. {amount / 1e7:,.2f} crore"
+    return f"Rs. {amount:,.2f}".replace(".00", "")
+
+
+def rating_meaning(rating):
+    grade = re.search(r"IPO\s+Grade\s+(\d)", rating, re.IGNORECASE)
+    if grade:
+        return IPO_GRADES.get(grade.group(1))
+    letters = re.search(r"(?:CARE-NP|\])\s*L?([A-D]{1,3})", rating, re.IGNORECASE)
+    if letters:
+        return CARE_GRADES.get(letters.group(1).upper())
+    return None
+
+
+GENERAL_PUBLIC = "Ordinary shares to the general public"
+FPO_TO_PUBLIC = "Ordinary shares (FPO) to the general public"
+FPO_RE = re.compile(r"\bfpo\b|further public offering")
+# Who an issue is for, checked in this order against one piece of text
+AUDIENCES = [
+    (re.compile(r"working abroad|foreign employ(?:ment|ed)"), "Ordinary shares to Nepalese citizens working abroad"),
+    (re.compile(r"project[ -]affected|to the locals|for locals"), "Ordinary shares to locals of the project-affected area"),
+    # "mutual funds" (plural) is a reserved quota of an ordinary issue, not a fund's own units
+    (re.compile(r"mutual fund(?!s)|growth fund|fund scheme"), "Mutual fund units"),
+    (FPO_RE, FPO_TO_PUBLIC),
+    (re.compile(r"general public"), GENERAL_PUBLIC),
+]
+
+
+def _audience(text):
+    text = (text or "").lower()
+    return next((label for pattern, label in AUDIENCES if pattern.search(text)), None)
+
+
+def share_type(title, text, offer_sentence=None):
+    """
+    Who the issue is for, from the usual ShareSansar wording. The title and the sentence
+    announcing the issue decide. Only when neither names anyone is the rest of the article
+    read, and there the general public wins over reserved quotas mentioned in passing (units for employees and
+    mutual funds, an earlier issue to project-affected locals).
+    """
+    primary = _audience(title) or _audience(offer_sentence)
+    if primary:
+        return primary
+    rest = (text or "").lower()
+    if "general public" in rest:
+        return FPO_TO_PUBLIC if FPO_RE.search(rest) else GENERAL_PUBLIC
+    return _audience(rest)
+
+
+def _issue_manager(sentence, company):
+    orgs = [org.strip() for org in ORG_RE.findall(sentence)]
+    orgs = [org for org in orgs if not company or org.lower() != company.lower()]
+    for org in orgs:
+        if re.search(r"Capital|Investment|Merchant|Securities|Markets?", org):
+            return org
+    return orgs[0] if orgs else None
+
+
+def _classify_dates(sentence):
+    """
+    Labels each date in a sentence by the nearest cue word in front of it:
+    [("opening_date" | "closing_date" | "final_closing_date", date), ...]
+    """
+    labelled, start = [], 0
+    for match in DATE_RE.finditer(sentence):
+        cues = [cue.group(1).lower() for cue in DATE_CUE_RE.finditer(sentence, start, match.start())]
+        start = match.end()
+        # "... by Bhadra 5 at the latest" puts the cue after the date
+        trailing = re.match(r"\W*at the (earliest|latest)", sentence[match.end():], re.IGNORECASE)
+        if trailing:
+            cues.append("latest" if trailing.group(1).lower() == "latest" else "early closing")
+        if not cues:
+            continue
+        cue = cues[-1]
+        if cue.startswith(("extended", "late", "latest")):
+            labelled.append(("final_closing_date", match.group(0)))
+        elif cue.startswith(("clos", "till", "until", "ends", "early")):
+            labelled.append(("closing_date", match.group(0)))
+        else:
+            labelled.append(("opening_date", match.group(0)))
+    return labelled
+
+
+def extract_ipo_details(title, content):
+    """
+    Reads the key facts of an IPO announcement out of the article text.
+
+    Returns a dict with `is_offer` (the article announces an issue people can apply for), the
+    fields that were found (company, units, issue_amount, price_per_share, opening_date,
+    closing_date, final_closing_date, share_type, min_units, max_units, issue_manager,
+    credit_rating, rating_meaning, net_worth_per_share) and `narrative`, the article text
+    minus the sentences those fields came from. Fields that aren't in the article are None.
+    """
+    content = content or ""
+    details = {
+        "is_offer": False,
+        "company": None,
+        "units": None,
+        "issue_amount": None,
+        "price_per_share": None,
+        "opening_date": None,
+        "closing_date": None,
+        "final_closing_date": None,
+        "share_type": None,
+        "min_units": None,
+        "max_units": None,
+        "issue_manager": None,
+        "credit_rating": None,
+        "rating_meaning": None,
+        "net_worth_per_share": None,
+        "narrative": content,
+    }
+    if not content or content.startswith("FAILURE:") or not OFFER_RE.search(title or ""):
+        return details
+    if NOT_AN_OFFER_RE.search(title):
+        return details
+
+    sentences = split_sentences(content)
+    used = set()
+    offer_sentence = None
+
+    for i, sentence in enumerate(sentences):
+        lower = sentence.lower()
+
+        if details["units"] is None and re.search(r"\b(going to issue|will issue|is issuing|to issue|has issued|floats?|floating)\b", lower):
+            units = UNITS_RE.search(sentence)
+            if units:
+                details["units"] = int(parse_number(units.group(1)))
+                offer_sentence = sentence
+                company = ORG_RE.match(sentence)
+                if company:
+                    details["company"] = company.group(1).strip()
+                used.add(i)
+
+        if details["min_units"] is None and "minimum" in lower and ("units" in lower or "kitta" in lower):
+            amounts = [int(parse_number(u)) for u in UNITS_RE.findall(sentence)]
+            if amounts:
+                details["min_units"] = amounts[0]
+                details["max_units"] = amounts[1] if len(amounts) > 1 and "maximum" in lower else None
+                used.add(i)
+
+        if "per share" in lower or "per unit" in lower or "face value" in lower or "par value" in lower:
+            for money in RUPEES_RE.finditer(sentence):
+                tail = sentence[money.end():money.end() + 20].lower()
+                head = sentence[max(0, money.start() - 25):money.start()].lower()
+                if "net worth" in head or "nwps" in head:
+                    continue
+                if "per share" in tail or "per unit" in tail or "value" in head or "price" in head:
+                    details["price_per_share"] = details["price_per_share"] or parse_rupees(money)
+                    used.add(i)
+                    break
+
+        amount_cue = ISSUE_AMOUNT_RE.search(sentence)
+        if details["issue_amount"] is None and amount_cue:
+            money = RUPEES_RE.search(sentence, amount_cue.end())
+            if money:
+                details["issue_amount"] = parse_rupees(money)
+                used.add(i)
+
+        for kind, date in _classify_dates(sentence):
+            if details[kind] is None:
+                details[kind] = date
+                used.add(i)
+
+        if details["issue_manager"] is None and "issue manager" in lower:
+            details["issue_manager"] = _issue_manager(sentence, details["company"])
+            if details["issue_manager"]:
+                used.add(i)
+
+        if details["credit_rating"] is None and re.search(r"\b(rated|rating|grade)\b", lower):
+            rating = RATING_RE.search(sentence) or QUOTED_RE.search(sentence)
+            if rating:
+                details["credit_rating"] = rating.group(1).strip()
+                details["rating_meaning"] = rating_meaning(details["credit_rating"])
+                used.add(i)
+
+        if details["net_worth_per_share"] is None:
+            nwps = NWPS_RE.search(sentence)
+            if nwps:
+                # the figure is normally right after the phrase, sometimes before it ("Rs. 112 net worth per share")
+                money = RUPEES_RE.search(sentence, nwps.end()) or RUPEES_RE.search(sentence)
+                if money:
+                    details["net_worth_per_share"] = parse_rupees(money)
+                    used.add(i)
+
+    if details["issue_amount"] is None and details["units"] and details["price_per_share"]:
+        details["issue_amount"] = details["units"] * details["price_per_share"]
+    details["share_type"] = share_type(title, content, offer_sentence)
+    details["is_offer"] = details["units"] is not None and details["opening_date"] is not None
+    details["narrative"] = "\n".join(s for i, s in enumerate(sentences) if i not in used)
+    return details
+
+
+def opening_range(net_worth_per_share):
+    """
+    (low, high) first-day opening price range in rupees, or None without a net worth figure.
+    """
+    if not net_worth_per_share:
+        return None
+    low, high = OPENING_RANGE_MULTIPLES
+    return round(net_worth_per_share * low, 2), round(net_worth_per_share * high, 2)
+
+
+def render_key_details(details):
+    """
+    The "Key IPO Details" section of the IPO report as markdown.
+    """
+    missing = "Not mentioned in the article"
+    units = f"{details['units']:,} units" if details["units"] else None
+    amount = format_rupees(details["issue_amount"]) if details["issue_amount"] else None
+    if details["price_per_share"]:
+        amount = f"{amount or ''} at Rs. {details['price_per_share']:g} per share".strip()
+    issue_size = ", ".join(part for part in (units, amount) if part) or missing
+
+    dates = missing
+    if details["opening_date"]:
+        dates = f"Opens {details['opening_date']}"
+        if details["closing_date"]:
+            dates += f", closes {details['closing_date']}"
+        if details["final_closing_date"]:
+            dates += f" (can be extended to {details['final_closing_date']})"
+
+    rating = details["credit_rating"] or missing
+    if details["rating_meaning"]:
+        rating = f"{rating} ({details['rating_meaning']})"
+
+    lines = [
+        "### 1. Key IPO Details",
+        f"- **Issue Size:** {issue_size}",
+        f"- **Opening/Closing Dates:** {dates}",
+        f"- **Type of Shares:** {details['share_type'] or missing}",
+        f"- **Issue Manager:** {details['issue_manager'] or missing}",
+        f"- **Credit Rating:** {rating}",
+    ]
+    if details["min_units"]:
+        application = f"Minimum {details['min_units']:,} units"
+        if details["max_units"]:
+            application += f", maximum {details['max_units']:,} units"
+        lines.append(f"- **Application Limits:** {application}")
+    return "\n".join(lines)
+
+
+def render_opening_range(details):
+    """
+    The "Opening Range Estimate" bullet of the IPO report as markdown.
+    """
+    estimate = opening_range(details["net_worth_per_share"])
+    if estimate is None:
+        return "- **Opening Range Estimate:** The article doesn't mention the net worth per share, so the opening range cannot be estimated."
+    low, high = OPENING_RANGE_MULTIPLES
+    return (
+        f"- **Opening Range Estimate:** With a net worth per share of Rs. {details['net_worth_per_share']:g}, "
+        f"the first-day opening range is typically {low}x to {high}x that figure: **Rs. {estimate[0]:g} to Rs. {estimate[1]:g}**."
+    )
@@ -1,27 +1,293 @@
+import hashlib
 import os
-from google import genai
+import sqlite3
+import threading
+import time
+
+from llm_scheduler import PRIORITY_PAGE, LLMScheduler, QuotaExceeded
+from settings import data_path
+from telemetry import count, observe, span
 
 # --- IMPORTANT ---
 # Do NOT hardcode API keys. Use environment variables for security.
 # The API key will be read from the environment variable named 'GEMINI_API_KEY'.
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 
-if GEMINI_API_KEY is None:
-    raise ValueError("GEMINI_API_KEY environment variable not set. Please set it securely.")
+MODEL = "gemini-2.0-flash-lite"  # can be changed to other versions like gemini-2.5-flash or gemini-2.5-pro
+
+# Default lifetime of a cached response; call sites pass their own (None = never expires, 0 = don't cache)
+DEFAULT_CACHE_TTL = 24 * 60 * 60
+# Oldest-used entries are evicted once the cache holds more than this many responses
+CACHE_MAX_ENTRIES = 2000
+# What a failed call returns (or, streaming, yields last) in place of an answer
+RATE_LIMIT_MESSAGE = "Rate limit exceeded."
+API_ERROR_MESSAGE = "An error occurred with the LLM API:"
+
+
+def is_error_response(text):
+    return not text or text.startswith(RATE_LIMIT_MESSAGE) or API_ERROR_MESSAGE in text
+
+
+class ResponseCache:
+    """
+    Disk-backed, content-addressed cache of LLM responses.
+
+    Entries are keyed by a hash of (model, prompt), so identical prompts are answered
+    from disk without a Gemini call. Each entry carries its own expiry and a last-access
+    time used for LRU eviction once the cache grows past `max_entries`.
+    """
+
+    def __init__(self, path=None, max_entries=CACHE_MAX_ENTRIES):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or data_path("llm_cache.sqlite3"), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                response TEXT NOT NULL,
+                expires_at REAL,
+                last_access REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS responses_last_access ON responses (last_access)")
+        self._conn.commit()
+
+    @staticmethod
+    def make_key(model, prompt):
+        return hashlib.sha256(f"{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, expires_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or (row[1] is not None and row[1] <= now):
+                self.misses += 1
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def put(self, key, response, ttl):
+        now = time.time()
+        expires_at = None if ttl is None else now + ttl
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, expires_at, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, expires_at, now),
+            )
+            # Drop expired entries first, then the least recently used ones beyond the size bound
+            self._conn.execute("DELETE FROM responses WHERE expires_at IS NOT NULL AND expires_at <= ?", (now,))
+            self._conn.execute(
+                "DELETE FROM responses WHERE key IN "
+                "(SELECT key FROM responses ORDER BY last_access DESC LIMIT -1 OFFSET ?)",
+                (self.max_entries,),
+            )
+            self._conn.commit()
+
+    def stats(self):
+        with self._lock:
+            entries = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": self.hits / lookups if lookups else 0.0,
+            "entries": entries,
+        }
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+            self._conn.commit()
+
+
+response_cache = ResponseCache()
+
+# Setup for Google Gemini. google.genai is slow to import, so the client is only built when the
+# first AI answer is needed (or by warm_up() once a page has rendered), then shared by every call.
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    global _client
+    with _client_lock:
+        if _client is None:
+            if GEMINI_API_KEY is None:
+                raise ValueError("GEMINI_API_KEY environment variable not set. Please set it securely.")
+            with span("llm.client_init"):
+                from google import genai
+                _client = genai.Client(api_key=GEMINI_API_KEY)
+        return _client
+
+
+def warm_up():
+    """
+    Builds the client on a background thread so the first AI request doesn't pay for the import.
+    """
+    def build():
+        try:
+            get_client()
+        except Exception as e:
+            print(f"Could not prepare the Gemini client: {e}")
+
+    threading.Thread(target=build, name="llm-warm-up", daemon=True).start()
+
+# Every Gemini call in this process goes through one scheduler: at most 4 calls at once,
+# 30 requests/minute overall (the Gemini free tier) and 6 per user
+scheduler = LLMScheduler(max_workers=4, global_per_minute=30, user_per_minute=6)
 
-# Setup for Google Gemini
-# The client automatically gets the API key from the environment variable
-client = genai.Client(api_key=GEMINI_API_KEY)
 
-def generate_response(prompt):
+def generate_response(prompt, cache_ttl=DEFAULT_CACHE_TTL, priority=PRIORITY_PAGE, user=None):
     """
     Generates a response from the Google Gemini model.
+    Identical prompts are served from the response cache for `cache_ttl` seconds
+    (None keeps the answer forever, 0 skips the cache). Cache misses are queued on the
+    scheduler with the given priority and charged to `user`'s quota.
     """
+    key = ResponseCache.make_key(MODEL, prompt)
+    if cache_ttl != 0:
+        cached = response_cache.get(key)
+        count("llm_cache", result="miss" if cached is None else "hit")
+        if cached is not None:
+            return cached
+
+    def call():
+        with span("llm.generate", model=MODEL, prompt_chars=len(prompt)):
+            return get_client().models.generate_content(
+                model=MODEL,
+                contents=prompt
+            ).text
+
     try:
-        response = client.models.generate_content(
-            model="gemini-2.0-flash-lite",  # Using Gemini 2.5 Flash, can be changed to other versions like gemini-2.5-pro
-            contents=prompt
-        )
-        return response.text
+        with span("llm.request", priority=priority):
+            text = scheduler.run(call, key=key, priority=priority, user=user)
+    except QuotaExceeded as e:
+        count("llm.rejected")
+        return f"{RATE_LIMIT_MESSAGE} {e}"
     except Exception as e:
-        return f"An error occurred with the LLM API: {e}"
+        count("llm.errors", error=type(e).__name__)
+        return f"{API_ERROR_MESSAGE} {e}"
+
+    # Only real answers are cached, errors should be retried on the next call
+    if cache_ttl != 0 and text:
+        response_cache.put(key, text, cache_ttl)
+    return text
+
+
+class _ChunkFeed:
+    """
+    Chunks of one streamed answer as they arrive. Every reader gets them all from the start,
+    so a request that joins a stream already running replays what was sent and follows the rest.
+    """
+
+    def __init__(self):
+        self.chunks = []
+        self.error = None
+        self.done = False
+        self._cond = threading.Condition()
+
+    def put(self, chunk):
+        with self._cond:
+            self.chunks.append(chunk)
+            self._cond.notify_all()
+
+    def close(self, error=None):
+        with self._cond:
+            self.error = error
+            self.done = True
+            self._cond.notify_all()
+
+    def __iter__(self):
+        sent = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: sent < len(self.chunks) or self.done)
+                if sent == len(self.chunks):
+                    return
+                new = self.chunks[sent:]
+                sent = len(self.chunks)
+            yield from new
+
+
+# Streams in flight by response-cache key: an identical prompt joins the running stream
+# instead of starting another Gemini call
+_streams = {}
+_streams_lock = threading.RLock()
+
+
+def generate_response_stream(prompt, cache_ttl=DEFAULT_CACHE_TTL, priority=PRIORITY_PAGE, user=None):
+    """
+    Streaming variant of generate_response: yields the answer in chunks as Gemini produces
+    them, so the UI can show the first words immediately. A cached answer is yielded in one
+    piece, and a completed stream is written to the cache just like a blocking call.
+    The stream itself runs on a scheduler worker and hands chunks over through a _ChunkFeed,
+    which identical prompts asked while it runs read too.
+    """
+    key = ResponseCache.make_key(MODEL, prompt)
+    if cache_ttl != 0:
+        cached = response_cache.get(key)
+        count("llm_cache", result="miss" if cached is None else "hit")
+        if cached is not None:
+            yield cached
+            return
+
+    requested_at = time.perf_counter()
+
+    def call(feed):
+        emitted = False
+        try:
+            with span("llm.generate_stream", model=MODEL, prompt_chars=len(prompt)):
+                for chunk in get_client().models.generate_content_stream(model=MODEL, contents=prompt):
+                    if chunk.text:
+                        if not emitted:
+                            # what the user actually waits for: queueing plus the first streamed words
+                            observe("llm.time_to_first_chunk", (time.perf_counter() - requested_at) * 1000)
+                        feed.put(chunk.text)
+                        emitted = True
+        except Exception as e:
+            # Chunks already shown can't be taken back, so only a stream that never started is retried
+            if emitted:
+                raise RuntimeError("the response stream was interrupted") from e
+            raise
+
+    def finish(feed, future):
+        # runs once the stream ended, whether or not anyone is still reading it
+        with _streams_lock:
+            _streams.pop(key, None)
+        error = future.exception()
+        if error is None and cache_ttl != 0 and feed.chunks:
+            response_cache.put(key, "".join(feed.chunks), cache_ttl)
+        feed.close(error)
+
+    rejected = None
+    with _streams_lock:
+        feed = _streams.get(key)
+        if feed is not None:
+            count("llm.coalesced", kind="stream")
+        else:
+            # The scheduler doesn't coalesce these itself (no key): a finished stream leaves
+            # _streams before the scheduler forgets its job, and a new one must not join that
+            feed = _ChunkFeed()
+            try:
+                future = scheduler.submit(lambda: call(feed), priority=priority, user=user)
+            except QuotaExceeded as e:
+                rejected = e
+            else:
+                _streams[key] = feed
+                future.add_done_callback(lambda future, feed=feed: finish(feed, future))
+    if rejected is not None:
+        count("llm.rejected")
+        yield f"{RATE_LIMIT_MESSAGE} {rejected}"
+        return
+
+    yield from feed
+    if feed.error is not None:
+        count("llm.errors", error=type(feed.error).__name__)
+        yield f"{API_ERROR_MESSAGE} {feed.error}"
@@ -0,0 +1,194 @@
+import heapq
+import itertools
+import random
+import threading
+import time
+from concurrent.futures import Future
+
+# Priority classes, lower runs first
+PRIORITY_INTERACTIVE = 0   # chat answers a user is waiting on
+PRIORITY_PAGE = 1          # reports rendered on a page view
+PRIORITY_BACKGROUND = 2    # precomputed reports from the background refresher
+
+# How often (seconds) buckets of users who stopped asking are dropped
+USER_BUCKET_SWEEP_INTERVAL = 60
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised at submit time when a user's token bucket is empty.
+    """
+
+
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst=None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst or rate_per_minute)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self):
+        with self._lock:
+            self._refill()
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def is_full(self):
+        # a full bucket is no different from a new one, so it can be dropped and rebuilt later
+        with self._lock:
+            self._refill()
+            return self.tokens >= self.capacity
+
+    def available(self):
+        with self._lock:
+            self._refill()
+            return self.tokens >= 1
+
+    def wait_time(self):
+        # Seconds until the next token is available
+        with self._lock:
+            self._refill()
+            return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+def is_quota_error(error):
+    text = str(error).lower()
+    return "429" in text or "resource_exhausted" in text or "quota" in text or "rate limit" in text
+
+
+class LLMScheduler:
+    """
+    Process-wide front door for LLM calls.
+
+    Jobs wait in a priority queue and run on a bounded pool of worker threads, so interactive
+    chat overtakes background reports and we never have more than `max_workers` calls in flight.
+    Identical in-flight requests (same key) share one call. Every call spends a token from a
+    global bucket (workers wait for one) and, if a user is given, from that user's bucket
+    (an empty bucket rejects the request straight away). Quota errors from the API are retried
+    with exponential backoff.
+    """
+
+    def __init__(self, max_workers=4, global_per_minute=30, user_per_minute=6, max_retries=3, backoff=2.0):
+        self.max_workers = max_workers
+        self.global_bucket = TokenBucket(global_per_minute)
+        self.user_per_minute = user_per_minute
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self._user_buckets = {}
+        self._swept_at = time.monotonic()
+        self._queue = []
+        self._sequence = itertools.count()
+        self._in_flight = {}
+        self._cond = threading.Condition()
+        self._workers = []
+        self._running = 0
+        self._stats = {"submitted": 0, "coalesced": 0, "rejected": 0, "retries": 0, "completed": 0, "failed": 0, "total_wait": 0.0}
+
+    def _ensure_workers(self):
+        if not self._workers:
+            for i in range(self.max_workers):
+                worker = threading.Thread(target=self._work, name=f"llm-worker-{i}", daemon=True)
+                worker.start()
+                self._workers.append(worker)
+
+    def _user_bucket(self, user):
+        with self._cond:
+            if user not in self._user_buckets:
+                self._sweep_user_buckets()
+                self._user_buckets[user] = TokenBucket(self.user_per_minute)
+            return self._user_buckets[user]
+
+    def _sweep_user_buckets(self):
+        # Every session has its own bucket; once it has refilled the user has been idle for a
+        # while, so only users active in the last minute or two keep one
+        now = time.monotonic()
+        if now - self._swept_at < USER_BUCKET_SWEEP_INTERVAL:
+            return
+        self._swept_at = now
+        for user in [user for user, bucket in self._user_buckets.items() if bucket.is_full()]:
+            del self._user_buckets[user]
+
+    def has_quota(self, user):
+        """
+        Whether `user` could submit a request right now (doesn't spend a token).
+        """
+        return self._user_bucket(user).available()
+
+    def submit(self, call, key=None, priority=PRIORITY_PAGE, user=None):
+        """
+        Queues `call` (a no-argument function) and returns a Future with its result.
+        With a `key`, a request identical to one already queued or running joins that one.
+        """
+        # Coalescing check, quota and insert are one critical section, so two identical
+        # requests can't both miss the in-flight entry and both run
+        with self._cond:
+            if key is not None and key in self._in_flight:
+                self._stats["coalesced"] += 1
+                return self._in_flight[key]
+
+            if user is not None and not self._user_bucket(user).try_take():
+                self._stats["rejected"] += 1
+                raise QuotaExceeded("Too many AI requests, please wait a minute and try again.")
+
+            future = Future()
+            self._ensure_workers()
+            if key is not None:
+                self._in_flight[key] = future
+            heapq.heappush(self._queue, (priority, next(self._sequence), time.monotonic(), key, call, future))
+            self._stats["submitted"] += 1
+            self._cond.notify()
+        return future
+
+    def run(self, call, key=None, priority=PRIORITY_PAGE, user=None):
+        return self.submit(call, key=key, priority=priority, user=user).result()
+
+    def _work(self):
+        while True:
+            with self._cond:
+                # The global token is taken before a job is picked, so whichever job has the
+                # highest priority once quota is available runs, not one popped while waiting
+                while not (self._queue and self.global_bucket.try_take()):
+                    self._cond.wait(timeout=self.global_bucket.wait_time() if self._queue else None)
+                _, _, queued_at, key, call, future = heapq.heappop(self._queue)
+                self._stats["total_wait"] += time.monotonic() - queued_at
+                self._running += 1
+
+            try:
+                future.set_result(self._call_with_retries(call))
+                self._stats["completed"] += 1
+            except Exception as e:
+                future.set_exception(e)
+                self._stats["failed"] += 1
+            finally:
+                with self._cond:
+                    self._running -= 1
+                    if key is not None:
+                        self._in_flight.pop(key, None)
+
+    def _call_with_retries(self, call):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return call()
+            except Exception as e:
+                if attempt == self.max_retries or not is_quota_error(e):
+                    raise
+                self._stats["retries"] += 1
+                time.sleep(self.backoff * (2 ** attempt) + random.uniform(0, self.backoff))
+
+    def stats(self):
+        with self._cond:
+            started = self._stats["submitted"] - len(self._queue)
+            return {
+                "queue_depth": len(self._queue),
+                "running": self._running,
+                "avg_wait_seconds": round(self._stats["total_wait"] / started, 3) if started else 0.0,
+                **{name: value for name, value in self._stats.items() if name != "total_wait"},
+            }
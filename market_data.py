@@ -1,32 +1,173 @@
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
 import pandas as pd
-from nepse import Nepse
 
-def get_market_data():
+from market_schema import normalize
+from telemetry import count, span, traced
+
+# Seconds each Market Overview endpoint gets before we give up on it and return partial data
+ENDPOINT_TIMEOUTS = {
+    "status": 8,
+    "gainers": 10,
+    "losers": 10,
+    "turnover": 10,
+    "indices": 10,
+    "nepse_index": 10,
+}
+# Failures that mean the client's session went bad (rather than a bad request): the HTTP
+# libraries' transport errors and the nepse library's token/network errors
+SESSION_ERROR_MODULES = ("httpx", "httpcore", "requests", "urllib3", "ssl")
+SESSION_ERROR_NAMES = {"NepseTokenExpired", "NepseNetworkError"}
+# How often fan_out() looks for calls that started (their timeout runs from then)
+FAN_OUT_POLL = 0.25
+
+
+def is_session_error(error):
+    """
+    True for transport and auth failures, which a fresh client can fix; False for data errors
+    (an unknown symbol, a bad argument) that would fail the same way again.
+    """
+    if isinstance(error, (ConnectionError, TimeoutError)):
+        return True
+    if type(error).__name__ in SESSION_ERROR_NAMES:
+        return True
+    response = getattr(error, "response", None)
+    if getattr(response, "status_code", None) in (401, 403):
+        return True
+    return type(error).__module__.split(".")[0] in SESSION_ERROR_MODULES and response is None
+
+
+class NepseClientManager:
+    """
+    Process-wide owner of one authenticated `Nepse` client.
+
+    Building a `Nepse()` object means a fresh TLS connection and token handshake, so
+    every caller (and every thread) shares this one instance. The library refreshes its
+    access token by itself when it expires; we only rebuild the client after a call fails,
+    in case the session itself went bad.
+    """
+
+    def __init__(self, max_workers=8, bulk_workers=8):
+        self._lock = threading.Lock()
+        self._api = None
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="nepse")
+        # Market-wide history loads get their own threads, so Market Overview never queues behind them
+        self._bulk_pool = ThreadPoolExecutor(max_workers=bulk_workers, thread_name_prefix="nepse-bulk")
+
+    def get_client(self):
+        with self._lock:
+            if self._api is None:
+                with span("nepse.connect"):
+                    from nepse import Nepse
+                    api = Nepse()
+                    api.setTLSVerification(False)
+                count("nepse.clients_built")
+                self._api = api
+            return self._api
+
+    def reset(self, failed_api=None):
+        with self._lock:
+            # Another thread may already have replaced the broken client
+            if failed_api is None or self._api is failed_api:
+                self._api = None
+
+    def call(self, method_name, *args):
+        """
+        Calls one API method on the shared client. If the session failed (see is_session_error)
+        the client is rebuilt and the call retried once; other errors are raised as they are.
+        """
+        with span("nepse.call", method=method_name):
+            api = self.get_client()
+            try:
+                return getattr(api, method_name)(*args)
+            except Exception as e:
+                count("nepse.errors", method=method_name, error=type(e).__name__)
+                if not is_session_error(e):
+                    raise
+                self.reset(api)
+                return getattr(self.get_client(), method_name)(*args)
+
+    def fan_out(self, calls, timeouts, bulk=False):
+        """
+        Runs independent API calls in parallel. `calls` maps a result key to (method_name, *args).
+        Returns (results, errors); a call that fails or misses its timeout lands in errors
+        instead of taking the whole batch down. A call's timeout runs from when it starts. On the
+        shared pool a call still queued after that long is cancelled too; `bulk` calls go on their
+        own pool and wait for the rest of their batch instead.
+        """
+        pool = self._bulk_pool if bulk else self._pool
+        submitted, started = time.monotonic(), {}
+
+        def run(key, call):
+            started[key] = time.monotonic()
+            return self.call(*call)
+
+        pending = {key: pool.submit(run, key, call) for key, call in calls.items()}
+        results, errors = {}, {}
+        while pending:
+            now = time.monotonic()
+            for key, future in list(pending.items()):
+                timeout = timeouts.get(key, 10)
+                if future.done():
+                    try:
+                        results[key] = future.result()
+                    except Exception as e:
+                        errors[key] = str(e)
+                elif (key in started or not bulk) and now - started.get(key, submitted) >= timeout:
+                    # a call that never started is dropped from the queue; a running one can't be stopped
+                    future.cancel()
+                    count("nepse.timeouts", method=calls[key][0])
+                    errors[key] = f"timed out after {timeout}s"
+                else:
+                    continue
+                del pending[key]
+            if pending:
+                deadlines = [started.get(key, submitted) + timeouts.get(key, 10) for key in pending
+                             if key in started or not bulk]
+                next_check = min(deadlines, default=now + FAN_OUT_POLL) - now
+                wait(list(pending.values()), timeout=max(0.0, min(next_check, FAN_OUT_POLL)), return_when=FIRST_COMPLETED)
+        return results, errors
+
+
+client_manager = NepseClientManager()
+
+
+@traced("market_data.get_market_data")
+def get_market_data(timeouts=None):
     try:
-        api = Nepse()
-        api.setTLSVerification(False)
-        
-        status = api.getMarketStatus()
-        gainers = api.getTopGainers()
-        losers = api.getTopLosers()
-        turnover = api.getTopTenTurnoverScrips()
-        indices = api.getNepseSubIndices()
-
-        # getNepseIndex returns a list with several indices
-        nepse_index_list = api.getNepseIndex()
+        results, errors = client_manager.fan_out(
+            {
+                "status": ("getMarketStatus",),
+                "gainers": ("getTopGainers",),
+                "losers": ("getTopLosers",),
+                "turnover": ("getTopTenTurnoverScrips",),
+                "indices": ("getNepseSubIndices",),
+                # getNepseIndex returns a list with several indices
+                "nepse_index": ("getNepseIndex",),
+            },
+            timeouts or ENDPOINT_TIMEOUTS,
+        )
+        if not results:
+            raise RuntimeError("; ".join(f"{key}: {error}" for key, error in errors.items()))
+        for key, error in errors.items():
+            print(f"Market data endpoint '{key}' failed, returning partial data: {error}")
+
+        nepse_index_list = results.get("nepse_index") or []
         nepse_index = next((item for item in nepse_index_list if item['index'] == 'NEPSE Index'), None)
-     
-        if nepse_index:
-            indices_df = pd.DataFrame([nepse_index] + indices)
-        else:
-            indices_df = pd.DataFrame(indices)
+        indices = results.get("indices") or []
 
+        # typed, compact frames (see market_schema) built once here, not per cache hit or render
         return {
-            "status": status.get('status', 'Unknown'),
-            "gainers": pd.DataFrame(gainers),
-            "losers": pd.DataFrame(losers),
-            "turnover": pd.DataFrame(turnover),
-            "indices": indices_df
+            # getMarketStatus reports "OPEN"/"CLOSE" under isOpen
+            "status": (results.get("status") or {}).get('isOpen', 'Unknown'),
+            "gainers": normalize(results.get("gainers"), "gainers"),
+            "losers": normalize(results.get("losers"), "losers"),
+            "turnover": normalize(results.get("turnover"), "turnover"),
+            "indices": normalize(([nepse_index] if nepse_index else []) + indices, "indices"),
+            # endpoints that failed or timed out, so the UI can flag partial data
+            "missing": sorted(errors),
         }
     except Exception as e:
         print(f"An error occurred while fetching market data: {e}")
@@ -34,19 +175,40 @@ def get_market_data():
 
 def get_all_companies():
     try:
-        api = Nepse()
-        api.setTLSVerification(False)
-        company_list = api.getCompanyList()
-        return pd.DataFrame(company_list)
+        company_list = client_manager.call("getCompanyList")
+        return normalize(company_list, "companies")
     except Exception as e:
         print(f"An error occurred fetching company list: {e}")
         return {"error": str(e)}
 
+@traced("market_data.get_price_history")
+def get_price_history(symbols, batch_size=32, timeout=60):
+    """
+    Daily price/volume history for many symbols, fetched concurrently through the shared client
+    in batches of `batch_size` (each batch gets `timeout` seconds).
+    Returns {symbol: DataFrame(businessDate, closePrice, highPrice, lowPrice, totalTradedQuantity)};
+    symbols whose history could not be fetched are left out.
+    """
+    histories = {}
+    for start in range(0, len(symbols), batch_size):
+        batch = symbols[start:start + batch_size]
+        results, errors = client_manager.fan_out(
+            {symbol: ("getCompanyPriceVolumeHistory", symbol) for symbol in batch},
+            {symbol: timeout for symbol in batch},
+            bulk=True,
+        )
+        for symbol, error in errors.items():
+            print(f"An error occurred fetching price history for {symbol}: {error}")
+        for symbol, result in results.items():
+            # the endpoint is paginated, the rows sit under 'content'
+            rows = result.get("content", []) if isinstance(result, dict) else result
+            if rows:
+                histories[symbol] = pd.DataFrame(rows)
+    return histories
+
 def get_company_details(symbol):
     try:
-        api = Nepse()
-        api.setTLSVerification(False)
-        details = api.getCompanyDetails(symbol)
+        details = client_manager.call("getCompanyDetails", symbol)
         return details
     except Exception as e:
         print(f"An error occurred fetching details for {symbol}: {e}")
@@ -0,0 +1,73 @@
+import math
+
+# Key column of each get_market_data() table, rows are matched on it between snapshots
+TABLE_KEYS = {"indices": "index", "gainers": "symbol", "losers": "symbol", "turnover": "symbol"}
+
+# The AI briefing is only rewritten when the NEPSE index's daily change moved by this many
+# percentage points since the briefing was written...
+BRIEFING_INDEX_MOVE = 0.5
+# ...or at least this many of the top BRIEFING_TOP_N symbols of a table were replaced,
+# or the market opened/closed in between
+BRIEFING_TOP_CHANGES = 2
+BRIEFING_TOP_N = 5
+
+
+def keyed_rows(df, key):
+    """
+    {key: row dict} for a snapshot table, the first row wins for duplicate keys.
+    """
+    if df is None or df.empty or key not in df:
+        return {}
+    rows = {}
+    for row in df.to_dict("records"):
+        # NaN never equals itself, store it as None so unchanged rows compare equal
+        rows.setdefault(row[key], {k: None if isinstance(v, float) and math.isnan(v) else v for k, v in row.items()})
+    return rows
+
+
+def index_lookup(indices_df):
+    return keyed_rows(indices_df, TABLE_KEYS["indices"])
+
+
+def changed_keys(previous, current):
+    """
+    Keys added, removed or with different values between two keyed_rows() results.
+    """
+    if previous is None:
+        return set(current)
+    return {key for key in previous.keys() | current.keys() if previous.get(key) != current.get(key)}
+
+
+def briefing_basis(market):
+    """
+    What an AI briefing was written from, compared by is_material_move() later on.
+    """
+    nepse = index_lookup(market.get("indices")).get("NEPSE Index") or {}
+    return {
+        "status": market.get("status"),
+        "nepse_change": nepse.get("perChange"),
+        "top": {
+            table: list(market[table]["symbol"].head(BRIEFING_TOP_N))
+            for table in ("gainers", "losers", "turnover")
+            if market.get(table) is not None and "symbol" in market[table]
+        },
+    }
+
+
+def is_material_move(basis, market):
+    """
+    Whether `market` differs enough from the snapshot a briefing was written from (`basis`)
+    to be worth a new one.
+    """
+    if basis is None:
+        return True
+    current = briefing_basis(market)
+    if current["status"] != basis["status"]:
+        return True
+    if current["nepse_change"] is not None and basis["nepse_change"] is not None:
+        if abs(float(current["nepse_change"]) - float(basis["nepse_change"])) >= BRIEFING_INDEX_MOVE:
+            return True
+    for table, symbols in current["top"].items():
+        if len(set(symbols) - set(basis["top"].get(table, []))) >= BRIEFING_TOP_CHANGES:
+            return True
+    return False
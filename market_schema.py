@@ -0,0 +1,114 @@
+import numpy as np
+import pandas as pd
+
+
+def _text_dtype():
+    # Arrow-backed strings that keep NaN as the missing value like object columns do (pandas >= 2.3,
+    # the default "str" dtype of pandas 3). Older pandas keeps plain object columns.
+    try:
+        return pd.StringDtype("pyarrow", na_value=np.nan)
+    except TypeError:
+        return object
+
+
+TEXT = _text_dtype()
+CATEGORY = "category"
+PRICE = "float32"
+# Rupee amounts in the billions need more than float32's 7 significant digits
+AMOUNT = "float64"
+
+# Columns kept per get_market_data() / get_all_companies() table and their dtype. The API sends
+# more (ids, generated times, contact details) that no page, prompt or snapshot uses. Only
+# labels that repeat across rows are categorical; symbols and index names are unique per table,
+# where a category would cost more than the strings it replaces.
+_MOVERS = {
+    "symbol": TEXT,
+    "securityName": TEXT,
+    "ltp": PRICE,
+    "cp": PRICE,
+    "pointChange": PRICE,
+    "percentageChange": PRICE,
+}
+SCHEMAS = {
+    "gainers": _MOVERS,
+    "losers": _MOVERS,
+    "turnover": {
+        "symbol": TEXT,
+        "securityName": TEXT,
+        "turnover": AMOUNT,
+        "closingPrice": PRICE,
+    },
+    "indices": {
+        "index": TEXT,
+        "currentValue": PRICE,
+        "change": PRICE,
+        "perChange": PRICE,
+        "high": PRICE,
+        "low": PRICE,
+        "previousClose": PRICE,
+        "fiftyTwoWeekHigh": PRICE,
+        "fiftyTwoWeekLow": PRICE,
+    },
+    "companies": {
+        "symbol": TEXT,
+        "companyName": TEXT,
+        "securityName": TEXT,
+        "sectorName": CATEGORY,
+        "status": CATEGORY,
+        "instrumentType": CATEGORY,
+    },
+}
+
+# Header (English, translated per language by the app) and number format of every column the
+# tables show; columns not listed here keep their API name
+DISPLAY_COLUMNS = {
+    "symbol": ("Symbol", None),
+    "securityName": ("Company", None),
+    "ltp": ("LTP", "%.2f"),
+    "lastTradedPrice": ("LTP", "%.2f"),
+    "cp": ("Previous Close", "%.2f"),
+    "pointChange": ("Change", "%.2f"),
+    "percentageChange": ("% Change", "%.2f"),
+    "turnover": ("Turnover", "%.2f"),
+    "closingPrice": ("Close", "%.2f"),
+    "index": ("Index", None),
+    "currentValue": ("Value", "%.2f"),
+    "change": ("Change", "%.2f"),
+    "perChange": ("% Change", "%.2f"),
+    "high": ("High", "%.2f"),
+    "low": ("Low", "%.2f"),
+    "previousClose": ("Previous Close", "%.2f"),
+    "fiftyTwoWeekHigh": ("52W High", "%.2f"),
+    "fiftyTwoWeekLow": ("52W Low", "%.2f"),
+    "title": ("IPO Announcement", None),
+    "date": ("Date", None),
+    "link": ("Source", None),
+}
+
+
+def empty_frame(table):
+    return pd.DataFrame({column: pd.Series(dtype=dtype) for column, dtype in SCHEMAS[table].items()})
+
+
+def normalize(records, table):
+    """
+    Typed, compact DataFrame for one table of API records (a list of dicts): only the schema's
+    columns, categorical sectors/statuses, float32 prices and Arrow-backed text. Done once when the
+    data is fetched, so caches pickle and pages render the small frame. If none of the schema's
+    columns are there (the API changed shape) the records are kept as they came.
+    """
+    df = records if isinstance(records, pd.DataFrame) else pd.DataFrame(records or [])
+    schema = SCHEMAS[table]
+    if df.empty:
+        return empty_frame(table)
+    present = [column for column in schema if column in df.columns]
+    if not present:
+        return df
+    df = df[present].copy()
+    for column in present:
+        dtype = schema[column]
+        if dtype in (PRICE, AMOUNT):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+    return df
@@ -0,0 +1,109 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from prompt_context import SCRIP_FIELDS, pick
+from telemetry import span, traced
+
+# Concurrent getCompanyDetails calls while valuing a portfolio (the NEPSE client pool is 8 wide)
+DETAILS_WORKERS = 8
+
+HOLDING_COLUMNS = ["symbol", "quantity", "avg_cost"]
+# Fields of getCompanyDetails the valuation needs, pulled out into one compact row per symbol
+QUOTE_FIELDS = {name: SCRIP_FIELDS[name] for name in ("name", "sector", "ltp", "previous_close")}
+
+
+def normalize_holdings(holdings):
+    """
+    Cleans user-entered holdings (symbol, quantity, avg_cost): symbols upper-cased, empty rows
+    dropped, repeated symbols merged with a quantity-weighted average cost. A quantity of 0
+    keeps the symbol on the watchlist without valuing it.
+    """
+    df = pd.DataFrame(holdings, columns=HOLDING_COLUMNS) if not isinstance(holdings, pd.DataFrame) else holdings
+    df = df.reindex(columns=HOLDING_COLUMNS)
+    df["symbol"] = df["symbol"].astype("string").str.strip().str.upper()
+    df = df[df["symbol"].notna() & (df["symbol"] != "")]
+    quantity = pd.to_numeric(df["quantity"], errors="coerce").fillna(0).clip(lower=0).to_numpy(np.float64)
+    avg_cost = pd.to_numeric(df["avg_cost"], errors="coerce").to_numpy(np.float64)
+    cost = np.where(np.isnan(avg_cost), np.nan, quantity * np.nan_to_num(avg_cost))
+
+    merged = pd.DataFrame({"symbol": df["symbol"].to_numpy(), "quantity": quantity, "cost": cost})
+    merged = merged.groupby("symbol", sort=False).agg(quantity=("quantity", "sum"), cost=("cost", lambda c: c.sum(min_count=1)))
+    merged["avg_cost"] = merged["cost"] / merged["quantity"].where(merged["quantity"] > 0)
+    return merged.reset_index()[HOLDING_COLUMNS]
+
+
+@traced("portfolio.fetch_quotes")
+def fetch_quotes(symbols, fetch_details, max_workers=DETAILS_WORKERS):
+    """
+    Calls `fetch_details(symbol)` (get_company_details, or a cached wrapper of it) for every
+    symbol on a bounded thread pool, so N symbols cost about one round trip per `max_workers`.
+    Returns (quotes DataFrame with symbol/name/sector/ltp/previous_close, {symbol: error}).
+    """
+    symbols = list(dict.fromkeys(symbols))
+    if not symbols:
+        return pd.DataFrame(columns=["symbol", *QUOTE_FIELDS]), {}
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(symbols)), thread_name_prefix="portfolio") as pool:
+        results = list(pool.map(fetch_details, symbols))
+
+    rows, errors = [], {}
+    for symbol, details in zip(symbols, results):
+        if not isinstance(details, dict) or "error" in details:
+            errors[symbol] = details.get("error") if isinstance(details, dict) else "no data"
+            continue
+        rows.append({"symbol": symbol, **{name: pick(details, path) for name, path in QUOTE_FIELDS.items()}})
+    quotes = pd.DataFrame(rows, columns=["symbol", *QUOTE_FIELDS])
+    for column in ("ltp", "previous_close"):
+        quotes[column] = pd.to_numeric(quotes[column], errors="coerce")
+    return quotes, errors
+
+
+def value_portfolio(holdings, quotes):
+    """
+    Market value, day P&L, unrealized gain and weights for every holding in one vectorized pass.
+    Returns (positions DataFrame, totals dict). Symbols without a quote are valued at NaN and
+    left out of the totals.
+    """
+    with span("portfolio.value", positions=len(holdings)):
+        positions = holdings.merge(quotes, on="symbol", how="left")
+        quantity = positions["quantity"].to_numpy(np.float64)
+        ltp = positions["ltp"].to_numpy(np.float64)
+        previous_close = positions["previous_close"].to_numpy(np.float64)
+        avg_cost = positions["avg_cost"].to_numpy(np.float64)
+
+        market_value = quantity * ltp
+        cost = quantity * avg_cost
+        positions["market_value"] = market_value
+        positions["day_pnl"] = quantity * (ltp - previous_close)
+        positions["day_change_pct"] = (ltp / previous_close - 1) * 100
+        positions["unrealized_gain"] = market_value - cost
+        positions["unrealized_pct"] = np.where(cost > 0, (market_value - cost) / np.where(cost > 0, cost, 1) * 100, np.nan)
+        total_value = np.nansum(market_value)
+        positions["weight_pct"] = market_value / total_value * 100 if total_value else np.nan
+
+        valued = ~np.isnan(market_value) & (quantity > 0)
+        total_cost = np.nansum(np.where(valued, cost, np.nan))
+        total_day_pnl = np.nansum(np.where(valued, positions["day_pnl"].to_numpy(), np.nan))
+        totals = {
+            "market_value": float(total_value),
+            "day_pnl": float(total_day_pnl),
+            "day_pnl_pct": float(total_day_pnl / (total_value - total_day_pnl) * 100) if total_value - total_day_pnl else 0.0,
+            "cost": float(total_cost),
+            "unrealized_gain": float(np.nansum(np.where(valued & ~np.isnan(cost), market_value - cost, np.nan))),
+            "positions": int(valued.sum()),
+        }
+    return positions, totals
+
+
+def sector_allocation(positions):
+    """
+    Market value and weight per sector, largest first.
+    """
+    held = positions[positions["market_value"].notna() & (positions["quantity"] > 0)]
+    if held.empty:
+        return pd.DataFrame(columns=["sector", "market_value", "weight_pct"])
+    by_sector = held.groupby(held["sector"].fillna("Unknown"), sort=False)["market_value"].sum()
+    allocation = by_sector.sort_values(ascending=False).rename_axis("sector").reset_index()
+    allocation["weight_pct"] = allocation["market_value"] / allocation["market_value"].sum() * 100
+    return allocation
@@ -0,0 +1,158 @@
+import json
+import re
+
+from retrieval import CHARS_PER_TOKEN, estimate_tokens
+
+# getCompanyDetails fields the scrip report talks about: label -> dotted path in the response
+SCRIP_FIELDS = {
+    "symbol": "security.symbol",
+    "name": "security.securityName",
+    "sector": "security.companyId.sectorMaster.sectorDescription",
+    "instrument": "security.instrumentType.description",
+    "as_of": "securityDailyTradeDto.businessDate",
+    "ltp": "securityDailyTradeDto.lastTradedPrice",
+    "previous_close": "securityDailyTradeDto.previousClose",
+    "open": "securityDailyTradeDto.openPrice",
+    "high": "securityDailyTradeDto.highPrice",
+    "low": "securityDailyTradeDto.lowPrice",
+    "volume": "securityDailyTradeDto.totalTradeQuantity",
+    "trades": "securityDailyTradeDto.totalTrades",
+    "52w_high": "securityDailyTradeDto.fiftyTwoWeekHigh",
+    "52w_low": "securityDailyTradeDto.fiftyTwoWeekLow",
+    "market_cap": "marketCapitalization",
+    "listed_shares": "stockListedShares",
+    "paid_up_capital": "paidUpCapital",
+    "public_pct": "publicPercentage",
+    "promoter_pct": "promoterPercentage",
+}
+
+# Columns of the market movers tables the briefing needs (names hint at the sector)
+MARKET_TABLE_COLUMNS = {
+    "gainers": ["symbol", "securityName", "ltp", "pointChange", "percentageChange"],
+    "losers": ["symbol", "securityName", "ltp", "pointChange", "percentageChange"],
+    "turnover": ["symbol", "securityName", "turnover", "closingPrice"],
+}
+
+# Lines of a scraped article that never carry information about the issue
+BOILERPLATE_RE = re.compile(
+    r"^(also read|read more|related news|click here|share (this|on)|follow us|download (our|the)|"
+    r"disclaimer|advertisement|sponsored|copyright|©|facebook|twitter|whatsapp|viber|telegram)\b",
+    re.IGNORECASE,
+)
+# A run of at least this many short lines is a flattened table, folded into one " | " row
+TABLE_MIN_CELLS = 4
+TABLE_CELL_MAX_WORDS = 4
+
+
+def pick(data, path):
+    """
+    Value at a dotted path in nested dicts, None if any step is missing.
+    """
+    for key in path.split("."):
+        if not isinstance(data, dict):
+            return None
+        data = data.get(key)
+    return data
+
+
+def minify(value):
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False, default=str)
+
+
+def encode_record(data, fields):
+    """
+    `label: value` lines for the `fields` (label -> dotted path) present in `data`. If none of
+    them are there (the API changed shape) the whole record is sent as minified JSON instead.
+    """
+    if isinstance(data, str):
+        try:
+            data = json.loads(data)
+        except ValueError:
+            return data
+    lines = []
+    for label, path in fields.items():
+        value = pick(data, path)
+        if value not in (None, ""):
+            lines.append(f"{label}: {value}")
+    return "\n".join(lines) if lines else minify(data)
+
+
+def encode_scrip_details(details):
+    return encode_record(details, SCRIP_FIELDS)
+
+
+def encode_table(df, columns, rows=5):
+    """
+    The first `rows` rows of `df` as CSV, limited to the `columns` it has, floats to 2 decimals.
+    """
+    if df is None or df.empty:
+        return "(no data)"
+    present = [c for c in columns if c in df.columns] or list(df.columns)
+    return df[present].head(rows).to_csv(index=False, float_format="%.2f", lineterminator="\n").strip()
+
+
+def encode_market_tables(gainers_df, losers_df, turnover_df, rows=5):
+    return {
+        "gainers": encode_table(gainers_df, MARKET_TABLE_COLUMNS["gainers"], rows),
+        "losers": encode_table(losers_df, MARKET_TABLE_COLUMNS["losers"], rows),
+        "turnover": encode_table(turnover_df, MARKET_TABLE_COLUMNS["turnover"], rows),
+    }
+
+
+def _is_table_cell(line):
+    return len(line.split()) <= TABLE_CELL_MAX_WORDS and not line.endswith((".", ":", "?", "!"))
+
+
+def clean_article(text):
+    """
+    Scraped article text without boilerplate lines and repeated lines (ShareSansar pages often
+    carry the body twice), with flattened table cells folded back into ' | ' rows.
+    """
+    lines, seen = [], set()
+    for line in (re.sub(r"\s+", " ", line).strip() for line in (text or "").splitlines()):
+        if not line or BOILERPLATE_RE.match(line) or (line in seen and not _is_table_cell(line)):
+            continue
+        seen.add(line)
+        lines.append(line)
+
+    cleaned, cells = [], []
+    for line in lines + [None]:
+        if line is not None and _is_table_cell(line):
+            cells.append(line)
+            continue
+        if len(cells) >= TABLE_MIN_CELLS:
+            cleaned.append(" | ".join(cells))
+        else:
+            cleaned.extend(cells)
+        cells = []
+        if line is not None:
+            cleaned.append(line)
+    return "\n".join(cleaned)
+
+
+def trim_to_budget(text, token_budget):
+    """
+    The leading whole lines of `text` that fit in `token_budget` (announcements put the facts
+    first). A first line that alone is over budget is cut hard.
+    """
+    if estimate_tokens(text) <= token_budget:
+        return text
+    kept, used = [], 0
+    for line in text.splitlines():
+        cost = estimate_tokens(line)
+        if used + cost > token_budget:
+            break
+        kept.append(line)
+        used += cost
+    if not kept:
+        return text[:token_budget * CHARS_PER_TOKEN] + " [...]"
+    return "\n".join(kept) + "\n[...]"
+
+
+def compact_prompt(prompt):
+    """
+    Prompt without the source-code indentation of the templates, trailing spaces and runs of
+    blank lines. Nothing in the prompts relies on leading whitespace.
+    """
+    lines = [line.strip() for line in prompt.strip().splitlines()]
+    return re.sub(r"\n{3,}", "\n\n", "\n".join(lines))
@@ -0,0 +1,142 @@
+import json
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+
+# Rough size of a token for Gemini-style tokenizers, good enough for budgeting prompts
+CHARS_PER_TOKEN = 4
+
+_WORD_RE = re.compile(r"[a-z0-9]+")
+_CAMEL_RE = re.compile(r"(?<=[a-z0-9])(?=[A-Z])")
+
+
+def estimate_tokens(text):
+    return max(1, len(text) // CHARS_PER_TOKEN)
+
+
+def tokenize(text):
+    # camelCase JSON keys ("fiftyTwoWeekHigh") should match plain words ("week high")
+    return _WORD_RE.findall(_CAMEL_RE.sub(" ", text).lower())
+
+
+def chunk_text(text, max_words=80, overlap=20):
+    """
+    Splits article text into overlapping word windows, never crossing a paragraph
+    boundary unless the paragraph itself is longer than a window.
+    """
+    passages = []
+    for paragraph in (p.strip() for p in re.split(r"\n\s*\n|\n", text)):
+        if not paragraph:
+            continue
+        words = paragraph.split()
+        if len(words) <= max_words:
+            passages.append(paragraph)
+            continue
+        step = max_words - overlap
+        for start in range(0, len(words) - overlap, step):
+            passages.append(" ".join(words[start:start + max_words]))
+
+    # Merge tiny neighbouring lines (ShareSansar articles have many one-liners) into one passage
+    merged = []
+    for passage in passages:
+        if merged and len(merged[-1].split()) + len(passage.split()) <= max_words // 2:
+            merged[-1] = f"{merged[-1]}\n{passage}"
+        else:
+            merged.append(passage)
+    return merged
+
+
+def flatten_json(value, path=""):
+    """
+    Turns nested JSON into 'dotted.path: value' lines, one passage per leaf field.
+    """
+    if isinstance(value, dict):
+        lines = []
+        for key, child in value.items():
+            lines.extend(flatten_json(child, f"{path}.{key}" if path else str(key)))
+        return lines
+    if isinstance(value, list):
+        lines = []
+        for i, child in enumerate(value):
+            lines.extend(flatten_json(child, f"{path}[{i}]"))
+        return lines
+    return [f"{path}: {value}"]
+
+
+class BM25Index:
+    """
+    Minimal Okapi BM25 over a list of passages, all in memory.
+    """
+
+    def __init__(self, passages, k1=1.5, b=0.75):
+        self.passages = passages
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(p)) for p in passages]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if passages else 0.0
+        doc_freq = Counter(term for tf in self.term_freqs for term in tf)
+        n = len(passages)
+        self.idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    def search(self, query, k=8):
+        """
+        Returns [(passage_index, score)] of the k best passages, best first.
+        """
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        scores = []
+        for i, tf in enumerate(self.term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            if score > 0:
+                scores.append((i, score))
+        scores.sort(key=lambda item: item[1], reverse=True)
+        return scores[:k]
+
+
+@lru_cache(maxsize=16)
+def build_index(data):
+    """
+    Chunks a chat context (article text or a JSON blob) and indexes it. Cached, so a
+    context is only chunked and indexed once however many questions are asked about it.
+    """
+    try:
+        parsed = json.loads(data)
+    except (TypeError, ValueError):
+        parsed = None
+    if isinstance(parsed, (dict, list)):
+        passages = flatten_json(parsed)
+    else:
+        passages = chunk_text(data)
+    return BM25Index(passages)
+
+
+def select_context(data, query, token_budget=1200, k=8):
+    """
+    Returns the part of `data` worth sending with `query`: the whole thing if it already
+    fits in `token_budget`, otherwise the top-k BM25 passages (kept in their original order)
+    until the budget is used up. With no matching passage the start of the data is used.
+    """
+    data = str(data)
+    if estimate_tokens(data) <= token_budget:
+        return data
+
+    index = build_index(data)
+    ranked = [i for i, _ in index.search(query, k=k)] or list(range(len(index.passages)))
+
+    chosen, used = [], 0
+    for i in ranked:
+        cost = estimate_tokens(index.passages[i])
+        if used + cost > token_budget:
+            continue
+        chosen.append(i)
+        used += cost
+    if not chosen:
+        # even the best passage is over budget, send as much of it as fits
+        return index.passages[ranked[0]][:token_budget * CHARS_PER_TOKEN]
+    return "\n".join(index.passages[i] for i in sorted(chosen))
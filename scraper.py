@@ -1,77 +1,214 @@
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
 import requests
-from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 import pandas as pd
 
-def get_article_content(url, headers):
+from article_store import conditional_headers, get_default_store
+from html_parsing import get_html_backend
+from ipo_extractor import extract_ipo_details
+from telemetry import count, span, traced
+
+LIST_URL = "https://www.sharesansar.com/category/ipo-fpo-news"
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+}
+
+# Status codes worth another try (rate limited or a temporary server hiccup)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Stored articles younger than this are trusted as-is, older ones get a conditional GET
+REVALIDATE_AFTER = 6 * 60 * 60
+
+
+class HostRateLimiter:
+    """
+    Politeness limit shared by all worker threads: hands out request slots
+    per host so we never hit sharesansar.com faster than `requests_per_second`.
+    """
+
+    def __init__(self, requests_per_second=None):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = {}
+
+    def wait(self, url):
+        if not self.min_interval:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def make_session(pool_size=8, headers=None):
+    """
+    Builds a keep-alive Session whose connection pool is big enough for every worker,
+    so the TLS handshake with sharesansar.com is paid once instead of per article.
+    """
+    session = requests.Session()
+    session.headers.update(headers or HEADERS)
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def fetch(url, session, rate_limiter=None, retries=3, backoff=0.5, timeout=10, headers=None):
+    """
+    GETs a URL through the shared session, retrying connection errors, timeouts,
+    429s and 5xx responses with exponential backoff (plus a little jitter).
+    """
+    for attempt in range(retries + 1):
+        if rate_limiter:
+            with span("scraper.rate_limit_wait"):
+                rate_limiter.wait(url)
+        try:
+            with span("scraper.http_get", url=url, attempt=attempt) as request_span:
+                response = session.get(url, headers=headers, timeout=timeout)
+                request_span.set(status=response.status_code, bytes=len(response.content))
+            count("scraper.http_responses", status=response.status_code)
+            if response.status_code in RETRY_STATUSES and attempt < retries:
+                raise requests.exceptions.RetryError(f"{response.status_code} from {url}")
+            response.raise_for_status()
+            return response
+        except (requests.exceptions.ConnectionError,
+                requests.exceptions.Timeout,
+                requests.exceptions.RetryError) as e:
+            count("scraper.http_retries", reason=type(e).__name__)
+            if attempt == retries:
+                raise
+            time.sleep(backoff * (2 ** attempt) + random.uniform(0, backoff))
+
+
+def get_article_content(url, headers=None, session=None, rate_limiter=None, store=None,
+                        revalidate_after=REVALIDATE_AFTER):
     """
     Visits a single article URL and robustly extracts the main text content
     using the specific and reliable ID selector '#newsdetail-content'.
+
+    Extracted text is kept in the local article store: an article validated less than
+    `revalidate_after` seconds ago is served without touching the network, older ones
+    are revalidated with a conditional GET and only re-parsed if the server says they changed.
     """
+    store = store or get_default_store()
+    record = store.get(url)
+    if record and time.time() - record["fetched_at"] < revalidate_after:
+        count("article_store", result="hit")
+        return record["content"]
+    count("article_store", result="miss")
+
+    session = session or make_session(pool_size=1, headers=headers)
     try:
-        article_response = requests.get(url, headers=headers, timeout=10)
-        article_response.raise_for_status()
-        article_soup = BeautifulSoup(article_response.content, 'html.parser')
-        
+        article_response = fetch(url, session, rate_limiter=rate_limiter, headers=conditional_headers(record))
+        if record and article_response.status_code == 304:
+            count("scraper.not_modified")
+            store.touch(url)
+            return record["content"]
+
         # Using the more reliable ID selector from your target code
-        # the '#' symbol selects by ID, which is less likely to change than a class
-        content_div = article_soup.select_one('#newsdetail-content')
-        
-        if content_div:
-            # .get_text() is more effective as it extracts all text from within the div,
-            # and separator='\n' preserves line breaks for better readability
-            return content_div.get_text(separator='\n', strip=True)
+        # the '#' symbol selects by ID, which is less likely to change than a class.
+        # Only that div's text is extracted (one string per line, like get_text(separator='\n', strip=True))
+        backend = get_html_backend()
+        with span("scraper.parse_article", backend=backend.name):
+            content = backend.text_by_id(article_response.content, 'newsdetail-content')
+
+        if content is not None:
+            store.put(
+                url, content,
+                etag=article_response.headers.get('ETag'),
+                last_modified=article_response.headers.get('Last-Modified'),
+            )
+            return content
         else:
             return "FAILURE: Could not find the '#newsdetail-content' block on the article page."
-            
+
     except requests.exceptions.RequestException as e:
+        count("scraper.errors", kind="article")
+        # A stale copy beats an error message when the site is briefly unreachable
+        if record:
+            return record["content"]
         return f"FAILURE: Failed to load the article page. Error: {e}"
 
-def scrape_upcoming_ipos():
+
+def list_page_url(page_number):
+    return LIST_URL if page_number == 1 else f"{LIST_URL}?page={page_number}"
+
+
+def parse_article_list(html):
+    """
+    Pulls (title, date, link) out of the '.featured-news-list' items of one list page.
+    """
+    if not html:
+        return []
+    backend = get_html_backend()
+    with span("scraper.parse_list", backend=backend.name):
+        return backend.article_list(html)
+
+
+@traced("scraper.scrape_upcoming_ipos")
+def scrape_upcoming_ipos(max_pages=2, max_articles=None, max_workers=8, requests_per_second=5.0):
     """
     Scrapes upcoming IPOs from ShareSansar, visits each article link,
-    and extracts the full text content for detailed analysis.
+    and extracts the full text content for detailed analysis. Each row also carries
+    `details`, the key IPO facts found by ipo_extractor.extract_ipo_details.
+
+    List pages and articles are fetched concurrently over one pooled session:
+    `max_pages` is how many pages of the IPO/FPO category to walk, `max_workers`
+    bounds the thread pool and `requests_per_second` is the per-host politeness limit.
     """
-    list_url = "https://www.sharesansar.com/category/ipo-fpo-news"
-    headers = {
-        'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
-    }
+    session = make_session(pool_size=max_workers)
+    rate_limiter = HostRateLimiter(requests_per_second)
 
-    try:
-        list_response = requests.get(list_url, headers=headers, timeout=10)
-        list_response.raise_for_status()
-    except requests.exceptions.RequestException as e:
-        return f"Error fetching IPO list URL: {e}"
-
-    soup = BeautifulSoup(list_response.content, 'html.parser')
-    articles_list = soup.find_all('div', class_='featured-news-list')
-
-    if not articles_list:
-        return "Could not find any articles on the main list page. The website layout may have changed."
-
-    ipo_data = []
-    
-    # --- Limiting to the first 5 articles to keep scraping fast and efficient ---
-    for article_div in articles_list[:5]:
-        title_tag = article_div.find('h4', class_='featured-news-title')
-        link_tag = article_div.find('a')
-        date_tag = article_div.find('span', class_='text-org')
-
-        if title_tag and link_tag and date_tag:
-            title = title_tag.get_text(strip=True)
-            link = link_tag['href']
-            date = date_tag.get_text(strip=True)
-            
-            print(f"Deep scraping content for: {title}")
-            # Use the robust helper function to get the full article content
-            article_text = get_article_content(link, headers)
-            
-            # Append the complete record in a single pass
-            ipo_data.append({
-                "title": title, 
-                "date": date, 
-                "link": link, 
-                "content": article_text
-            })
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        # Page 1 decides whether the site is reachable at all, the rest are best effort
+        try:
+            first_page = fetch(list_page_url(1), session, rate_limiter=rate_limiter)
+        except requests.exceptions.RequestException as e:
+            count("scraper.errors", kind="list")
+            return f"Error fetching IPO list URL: {e}"
+
+        def fetch_list_page(page_number):
+            try:
+                return fetch(list_page_url(page_number), session, rate_limiter=rate_limiter).content
+            except requests.exceptions.RequestException as e:
+                print(f"Skipping IPO list page {page_number}: {e}")
+                return b""
+
+        pages = [first_page.content] + list(pool.map(fetch_list_page, range(2, max_pages + 1)))
+        page_articles = [parse_article_list(html) for html in pages]
+
+        if not page_articles[0]:
+            return "Could not find any articles on the main list page. The website layout may have changed."
+
+        # Pinned/featured items can show up on several pages, keep the first occurrence only
+        articles, seen_links = [], set()
+        for article in (a for page in page_articles for a in page):
+            if article["link"] not in seen_links:
+                seen_links.add(article["link"])
+                articles.append(article)
+        if max_articles:
+            articles = articles[:max_articles]
+
+        def deep_scrape(article):
+            print(f"Deep scraping content for: {article['title']}")
+            return get_article_content(article["link"], session=session, rate_limiter=rate_limiter)
+
+        contents = list(pool.map(deep_scrape, articles))
+
+    # Key facts (issue size, dates, issue manager, rating...) are read off the article right away
+    ipo_data = [
+        {"title": a["title"], "date": a["date"], "link": a["link"], "content": content,
+         "details": extract_ipo_details(a["title"], content)}
+        for a, content in zip(articles, contents)
+    ]
 
     if not ipo_data:
         return "Found article containers, but could not extract any article details."
@@ -0,0 +1,204 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+from market_data import get_price_history
+
+# Trading days kept per symbol (a NEPSE year is ~240 sessions) and the indicator windows
+HISTORY_DAYS = 260
+YEAR_DAYS = 240
+VOLUME_WINDOW = 20
+
+
+class PriceMatrix:
+    """
+    Price/volume history of many symbols packed into contiguous (symbols x days) float arrays
+    on a shared date axis, oldest day first. Days a symbol didn't trade are NaN.
+    """
+
+    def __init__(self, symbols, dates, close, high, low, volume):
+        self.symbols = symbols
+        self.dates = dates
+        self.close = close
+        self.high = high
+        self.low = low
+        self.volume = volume
+
+    @classmethod
+    def from_histories(cls, histories, days=HISTORY_DAYS):
+        """
+        Builds the matrix from get_price_history() output ({symbol: DataFrame}).
+        """
+        frames = []
+        for symbol, frame in histories.items():
+            if frame.empty or "businessDate" not in frame:
+                continue
+            frames.append(frame.reindex(columns=["businessDate", "closePrice", "highPrice", "lowPrice", "totalTradedQuantity"]).assign(symbol=symbol))
+        if not frames:
+            empty = np.empty((0, 0))
+            return cls([], [], empty, empty, empty, empty)
+
+        long = pd.concat(frames, ignore_index=True)
+        long["businessDate"] = pd.to_datetime(long["businessDate"])
+        dates = np.sort(long["businessDate"].unique())[-days:]
+        long = long[long["businessDate"].isin(dates)]
+        symbols = sorted(long["symbol"].unique())
+
+        # Scatter every row straight into its (symbol, date) cell
+        rows = pd.Index(symbols).get_indexer(long["symbol"])
+        cols = pd.Index(dates).get_indexer(long["businessDate"])
+        arrays = []
+        for column in ["closePrice", "highPrice", "lowPrice", "totalTradedQuantity"]:
+            values = np.full((len(symbols), len(dates)), np.nan)
+            values[rows, cols] = pd.to_numeric(long[column], errors="coerce").to_numpy(dtype=float)
+            arrays.append(values)
+        return cls(symbols, list(pd.DatetimeIndex(dates)), *arrays)
+
+
+def forward_fill(values):
+    """
+    Carries the last traded value forward over NaN gaps, row by row, without a Python loop.
+    """
+    mask = np.isnan(values)
+    index = np.where(~mask, np.arange(values.shape[1]), 0)
+    np.maximum.accumulate(index, axis=1, out=index)
+    return values[np.arange(values.shape[0])[:, None], index]
+
+
+def sma(values, window):
+    """
+    Simple moving average of the last `window` columns for every row (NaN if too little history).
+    """
+    if values.shape[1] < window:
+        return np.full(values.shape[0], np.nan)
+    return values[:, -window:].mean(axis=1)
+
+
+def ema(values, span):
+    """
+    Exponential moving average of every row, stepping once over the date axis.
+    """
+    alpha = 2.0 / (span + 1)
+    result = values[:, 0].copy()
+    for t in range(1, values.shape[1]):
+        column = values[:, t]
+        result = np.where(np.isnan(result), column, np.where(np.isnan(column), result, alpha * column + (1 - alpha) * result))
+    return result
+
+
+def rsi(values, period=14):
+    """
+    Wilder's RSI of every row over the whole date axis.
+    """
+    deltas = np.diff(values, axis=1)
+    if deltas.shape[1] < period:
+        return np.full(values.shape[0], np.nan)
+    # Days before a symbol was listed count as flat, Wilder smoothing washes them out
+    gains = np.nan_to_num(np.clip(deltas, 0, None))
+    losses = np.nan_to_num(np.clip(-deltas, 0, None))
+    avg_gain = gains[:, :period].mean(axis=1)
+    avg_loss = losses[:, :period].mean(axis=1)
+    for t in range(period, deltas.shape[1]):
+        avg_gain = (avg_gain * (period - 1) + gains[:, t]) / period
+        avg_loss = (avg_loss * (period - 1) + losses[:, t]) / period
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rs = avg_gain / avg_loss
+        result = np.where(avg_loss == 0, 100.0, 100 - 100 / (1 + rs))
+    return np.where(np.isnan(values[:, -1]), np.nan, result)
+
+
+def compute_indicators(matrix, sectors=None):
+    """
+    One vectorized pass over the whole market. Returns one row per symbol with the last close,
+    day change, SMA/EMA, RSI, position inside the 52-week range (0 = at the low, 1 = at the high)
+    and today's volume relative to its recent average.
+    """
+    if not matrix.symbols:
+        return pd.DataFrame()
+    close = forward_fill(matrix.close)
+    volume = np.nan_to_num(matrix.volume)
+    last = close[:, -1]
+    previous = close[:, -2] if close.shape[1] > 1 else np.full(len(last), np.nan)
+
+    with warnings.catch_warnings():
+        # a symbol with no high/low inside the window just gets NaN
+        warnings.simplefilter("ignore", RuntimeWarning)
+        year_high = np.nanmax(matrix.high[:, -YEAR_DAYS:], axis=1)
+        year_low = np.nanmin(matrix.low[:, -YEAR_DAYS:], axis=1)
+    recent_volume = volume[:, -VOLUME_WINDOW - 1:-1].mean(axis=1) if volume.shape[1] > 1 else np.zeros(len(last))
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        frame = pd.DataFrame({
+            "symbol": matrix.symbols,
+            "close": last,
+            "change_pct": (last - previous) / previous * 100,
+            "sma_20": sma(close, 20),
+            "sma_50": sma(close, 50),
+            "ema_20": ema(close, 20),
+            "rsi_14": rsi(close, 14),
+            "high_52w": year_high,
+            "low_52w": year_low,
+            "range_52w_pos": (last - year_low) / (year_high - year_low),
+            "volume": volume[:, -1],
+            "volume_spike": np.where(recent_volume > 0, volume[:, -1] / recent_volume, np.nan),
+        })
+    if sectors is not None:
+        frame.insert(1, "sector", frame["symbol"].map(sectors).fillna("Unknown"))
+    return frame.round(2)
+
+
+def sector_summary(indicators):
+    """
+    Sector aggregates over compute_indicators() output.
+    """
+    if indicators.empty or "sector" not in indicators:
+        return pd.DataFrame()
+    return (
+        indicators.groupby("sector")
+        .agg(
+            symbols=("symbol", "count"),
+            avg_change_pct=("change_pct", "mean"),
+            avg_rsi=("rsi_14", "mean"),
+            advancing=("change_pct", lambda s: int((s > 0).sum())),
+            declining=("change_pct", lambda s: int((s < 0).sum())),
+            total_volume=("volume", "sum"),
+        )
+        .round(2)
+        .sort_values("avg_change_pct", ascending=False)
+        .reset_index()
+    )
+
+
+def active_equities(company_df):
+    """
+    Symbols worth screening from get_all_companies(): active listings, equities only when the
+    list says so. Returns {symbol: sector}.
+    """
+    companies = company_df
+    if "status" in companies:
+        companies = companies[companies["status"] == "A"]
+    if "instrumentType" in companies:
+        companies = companies[companies["instrumentType"] == "Equity"]
+    sectors = companies["sectorName"] if "sectorName" in companies else pd.Series("Unknown", index=companies.index)
+    return dict(zip(companies["symbol"], sectors))
+
+
+def load_market_indicators(company_df):
+    """
+    Fetches history for every active equity and computes the full-market indicator table.
+    """
+    sectors = active_equities(company_df)
+    matrix = PriceMatrix.from_histories(get_price_history(list(sectors)))
+    return compute_indicators(matrix, sectors)
+
+
+def load_symbol_indicators(symbol):
+    """
+    Indicator row for one symbol as a plain dict (empty if its history is unavailable).
+    """
+    indicators = compute_indicators(PriceMatrix.from_histories(get_price_history([symbol])))
+    if indicators.empty:
+        return {}
+    row = indicators.iloc[0].to_dict()
+    return {k: v for k, v in row.items() if not (isinstance(v, float) and np.isnan(v))}
@@ -0,0 +1,18 @@
+import os
+from datetime import timedelta, timezone
+
+# Everything the app persists locally (article store, caches, snapshots) lives under
+# one directory, overridable for deployments that mount a volume elsewhere.
+DATA_DIR = os.getenv("NEPSE_HUB_DATA_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".data"))
+
+# Nepal has no daylight saving, a fixed offset is enough (and needs no tzdata on Windows)
+NEPAL_TZ = timezone(timedelta(hours=5, minutes=45))
+
+
+def data_path(*parts):
+    """
+    Returns a path inside DATA_DIR, creating the parent directory on first use.
+    """
+    path = os.path.join(DATA_DIR, *parts)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    return path
@@ -0,0 +1,140 @@
+import glob
+import os
+import threading
+import uuid
+from datetime import datetime
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from cache_backend import get_shared_cache
+from settings import DATA_DIR, NEPAL_TZ
+
+# Columns kept per table (the API sends more, mostly ids we never chart) and the key
+# column range queries filter on
+TABLES = {
+    "indices": ("index", ["index", "currentValue", "change", "perChange", "high", "low", "previousClose"]),
+    "gainers": ("symbol", ["symbol", "ltp", "pointChange", "percentageChange"]),
+    "losers": ("symbol", ["symbol", "ltp", "pointChange", "percentageChange"]),
+    "turnover": ("symbol", ["symbol", "turnover", "closingPrice"]),
+}
+
+
+class SnapshotStore:
+    """
+    Append-only columnar history of market snapshots on local disk.
+
+    Each table is a Parquet dataset partitioned by trading day
+    (`<root>/<table>/day=YYYY-MM-DD/*.parquet`). Every snapshot is written as a small part
+    file; once a day is over its parts are compacted into a single file. Queries go through
+    pyarrow.dataset with partition and column pruning plus a predicate on the key column,
+    so only the requested range is ever read into memory, however many months are stored.
+    """
+
+    def __init__(self, root=None):
+        self.root = root or os.path.join(DATA_DIR, "snapshots")
+        self._lock = threading.Lock()
+
+    def _table_dir(self, table):
+        return os.path.join(self.root, table)
+
+    def append(self, market, taken_at=None):
+        """
+        Writes the indices/gainers/losers/turnover frames of one get_market_data() result.
+        """
+        taken_at = (taken_at or datetime.now(NEPAL_TZ)).astimezone(NEPAL_TZ)
+        day = taken_at.strftime("%Y-%m-%d")
+        with self._lock:
+            for table, (key, columns) in TABLES.items():
+                frame = market.get(table)
+                if frame is None or frame.empty or key not in frame:
+                    continue
+                frame = frame.reindex(columns=columns)
+                frame[key] = frame[key].astype(str)
+                for column in columns[1:]:
+                    frame[column] = pd.to_numeric(frame[column], errors="coerce").astype("float32")
+                frame.insert(0, "snapshot_time", pd.Timestamp(taken_at).tz_convert("UTC"))
+
+                day_dir = os.path.join(self._table_dir(table), f"day={day}")
+                os.makedirs(day_dir, exist_ok=True)
+                part = os.path.join(day_dir, f"part-{taken_at.strftime('%H%M%S%f')}.parquet")
+                pq.write_table(pa.Table.from_pandas(frame, preserve_index=False), part)
+            self._compact_before(day)
+
+    def _compact_before(self, today):
+        # Past days rarely get new parts, but every app process records snapshots, so a late part
+        # can land after its day was compacted: it is merged into the existing data.parquet, never
+        # written over it. The rewrite is serialized across processes through the shared cache.
+        with get_shared_cache().hold(f"snapshot_compaction:{self.root}", timeout=0) as held:
+            if not held:
+                return  # another process is compacting, the next append catches up
+            for table in TABLES:
+                for day_dir in glob.glob(os.path.join(self._table_dir(table), "day=*")):
+                    parts = sorted(glob.glob(os.path.join(day_dir, "part-*.parquet")))
+                    if os.path.basename(day_dir)[4:] >= today or not parts:
+                        continue
+                    compacted = os.path.join(day_dir, "data.parquet")
+                    sources = ([compacted] if os.path.exists(compacted) else []) + parts
+                    merged = pa.concat_tables([pq.read_table(p) for p in sources])
+                    # written beside it and swapped in, so readers never see a half-written file
+                    # (dataset discovery skips names starting with ".")
+                    staging = os.path.join(day_dir, f".data-{uuid.uuid4().hex}.parquet")
+                    pq.write_table(merged, staging)
+                    os.replace(staging, compacted)
+                    for p in parts:
+                        os.remove(p)
+
+    def query(self, table, keys=None, start=None, end=None, columns=None):
+        """
+        Rows of `table` between `start` and `end` (datetimes, default: today so far),
+        optionally only for the given index names / symbols, sorted by snapshot time.
+        """
+        key, all_columns = TABLES[table]
+        end = (end or datetime.now(NEPAL_TZ)).astimezone(NEPAL_TZ)
+        start = (start or end.replace(hour=0, minute=0, second=0, microsecond=0)).astimezone(NEPAL_TZ)
+        columns = ["snapshot_time"] + (columns or all_columns)
+        if key not in columns:
+            columns.append(key)
+
+        table_dir = self._table_dir(table)
+        if not os.path.isdir(table_dir):
+            return pd.DataFrame(columns=columns)
+
+        dataset = ds.dataset(table_dir, format="parquet", partitioning="hive")
+        condition = (
+            (ds.field("day") >= start.strftime("%Y-%m-%d"))
+            & (ds.field("day") <= end.strftime("%Y-%m-%d"))
+            & (ds.field("snapshot_time") >= pa.scalar(start, type=pa.timestamp("us", tz="UTC")))
+            & (ds.field("snapshot_time") <= pa.scalar(end, type=pa.timestamp("us", tz="UTC")))
+        )
+        if keys:
+            condition = condition & ds.field(key).isin(list(keys))
+        result = dataset.to_table(columns=columns, filter=condition).to_pandas()
+        result["snapshot_time"] = result["snapshot_time"].dt.tz_convert(NEPAL_TZ)
+        return result.sort_values("snapshot_time", ignore_index=True)
+
+
+_default_store = None
+_default_store_lock = threading.Lock()
+
+
+def get_snapshot_store():
+    global _default_store
+    with _default_store_lock:
+        if _default_store is None:
+            _default_store = SnapshotStore()
+        return _default_store
+
+
+def record_snapshot(market):
+    """
+    Appends a successful get_market_data() result to the history, never failing the caller.
+    """
+    if not isinstance(market, dict) or "error" in market:
+        return
+    try:
+        get_snapshot_store().append(market)
+    except Exception as e:
+        print(f"Could not record market snapshot: {e}")
@@ -0,0 +1,124 @@
+import re
+from collections import Counter
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize(text):
+    return _TOKEN_RE.findall(str(text).lower())
+
+
+def edit_distance(a, b):
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        previous = current
+    return previous[-1]
+
+
+def trigrams(text):
+    # Padded per word, so word starts weigh in and word order doesn't matter
+    grams = set()
+    for word in text.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SymbolSearchIndex:
+    """
+    In-memory search over the NEPSE company list, built once per company-list refresh.
+
+    A prefix trie over every word of the symbol, company name and sector answers
+    type-ahead queries ("nabil ba") without scanning the list; a trigram index catches
+    misspellings ("nabl", "upper tamakosi"). Results are ranked: exact symbol, symbol
+    prefix, all words matched, then fuzzy similarity.
+    """
+
+    def __init__(self, company_df):
+        self.entries = []
+        self._trie = {}
+        self._trigrams = {}
+        for row in company_df.to_dict("records"):
+            symbol = str(row.get("symbol", "")).strip()
+            if not symbol:
+                continue
+            name = str(row.get("companyName") or row.get("securityName") or "")
+            sector = str(row.get("sectorName") or "")
+            entry_id = len(self.entries)
+            symbol_key = symbol.lower()
+            name_key = " ".join(normalize(name))
+            self.entries.append({
+                "symbol": symbol,
+                "name": name,
+                "sector": sector,
+                "symbol_key": symbol_key,
+                "words": set(normalize(f"{symbol} {name} {sector}")),
+                "symbol_grams": trigrams(symbol_key),
+                "name_grams": trigrams(name_key),
+            })
+            for word in self.entries[-1]["words"]:
+                self._add_to_trie(word, entry_id)
+            for gram in self.entries[-1]["symbol_grams"] | self.entries[-1]["name_grams"]:
+                self._trigrams.setdefault(gram, set()).add(entry_id)
+
+    def _add_to_trie(self, word, entry_id):
+        # Every node keeps the ids below it, so a prefix lookup is one walk down the trie
+        node = self._trie
+        for char in word:
+            node = node.setdefault(char, {})
+            node.setdefault("$ids", set()).add(entry_id)
+
+    def _prefix_ids(self, prefix):
+        node = self._trie
+        for char in prefix:
+            node = node.get(char)
+            if node is None:
+                return set()
+        return node.get("$ids", set())
+
+    def search(self, query, limit=10):
+        """
+        Returns up to `limit` matching entries ({symbol, name, sector, score}), best first.
+        """
+        tokens = normalize(query)
+        if not tokens:
+            return []
+        query_key = " ".join(tokens)
+        compact_query = query_key.replace(" ", "")
+        query_grams = trigrams(query_key)
+
+        # Candidates: entries matching every typed word as a prefix, plus trigram neighbours
+        prefix_sets = [self._prefix_ids(token) for token in tokens]
+        all_words = set.intersection(*prefix_sets) if prefix_sets else set()
+        gram_hits = Counter(entry_id for gram in query_grams for entry_id in self._trigrams.get(gram, ()))
+        candidates = all_words | {entry_id for entry_id, _ in gram_hits.most_common(50)}
+
+        results = []
+        for entry_id in candidates:
+            entry = self.entries[entry_id]
+            # Misspelt symbols compare against the symbol as a whole, names by how much of the
+            # query they contain (a query is usually a fragment of a long company name)
+            similarity = max(
+                len(query_grams & entry["symbol_grams"]) / len(query_grams | entry["symbol_grams"]),
+                0.9 * len(query_grams & entry["name_grams"]) / len(query_grams),
+            )
+            if compact_query == entry["symbol_key"]:
+                score = 100.0
+            elif entry["symbol_key"].startswith(compact_query):
+                score = 80.0
+            elif entry_id in all_words:
+                score = 60.0
+            elif edit_distance(compact_query, entry["symbol_key"]) <= (1 if len(compact_query) <= 4 else 2):
+                # a typo in the symbol itself ("NABL", "NICAA")
+                score = 50.0
+            else:
+                score = 0.0
+            score += 40.0 * similarity
+            if score >= 25.0:
+                results.append({"symbol": entry["symbol"], "name": entry["name"], "sector": entry["sector"], "score": round(score, 1)})
+
+        results.sort(key=lambda r: (-r["score"], r["symbol"]))
+        return results[:limit]
@@ -0,0 +1,297 @@
+import bisect
+import functools
+import inspect
+import json
+import os
+import threading
+import time
+from collections import deque
+
+# "0" turns every span/counter below into a no-op
+TELEMETRY_ENABLED = os.getenv("NEPSE_HUB_TELEMETRY", "1") != "0"
+# "1" adds the Performance page to the app's sidebar
+ADMIN_PAGE_ENABLED = os.getenv("NEPSE_HUB_ADMIN", "0") == "1"
+
+# Latency histogram bucket upper bounds in milliseconds (Prometheus style, cumulative on export)
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 30000, float("inf"))
+# Finished spans kept for the "recent spans" table
+RECENT_SPANS = 500
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * len(BUCKETS_MS)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(BUCKETS_MS, value)] += 1
+        self.count += 1
+        self.sum += value
+        self.max = max(self.max, value)
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (the real max for the last one)
+        rank, seen = q * self.count, 0
+        for bound, bucket_count in zip(BUCKETS_MS, self.counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return min(bound, self.max)
+        return self.max
+
+    def to_dict(self):
+        return {
+            "count": self.count,
+            "avg_ms": round(self.sum / self.count, 2) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5), 2),
+            "p95_ms": round(self.quantile(0.95), 2),
+            "max_ms": round(self.max, 2),
+        }
+
+
+class Span:
+    """
+    One timed operation. Attributes can be added while it runs (`span.set(status=304)`).
+    """
+
+    __slots__ = ("name", "attributes", "parent", "start", "duration_ms", "error")
+
+    def __init__(self, name, attributes, parent):
+        self.name = name
+        self.attributes = attributes
+        self.parent = parent
+        self.start = time.time()
+        self.duration_ms = None
+        self.error = None
+
+    def set(self, **attributes):
+        self.attributes.update(attributes)
+
+
+class _NoopSpan:
+    def set(self, **attributes):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class _SpanContext:
+    __slots__ = ("_telemetry", "_span", "_started", "_followed")
+
+    def __init__(self, telemetry, span):
+        self._telemetry = telemetry
+        self._span = span
+        self._followed = False
+
+    def __enter__(self):
+        self._telemetry._stack().append(self._span.name)
+        self._started = time.perf_counter()
+        return self
+
+    def set(self, **attributes):
+        self._span.set(**attributes)
+
+    def __exit__(self, exc_type, exc, tb):
+        self._telemetry._stack().pop()
+        if exc_type is not None:
+            self._span.error = exc_type.__name__
+        if not self._followed or exc_type is not None:
+            self._finish()
+        return False
+
+    def follow(self, chunks):
+        """
+        Keeps the span open until the generator `chunks` is used up or closed, and returns a
+        generator yielding the same chunks. The span leaves the thread's span stack when the
+        block exits, it isn't held there across yields into the caller's code.
+        """
+        self._followed = True
+        return self._follow(chunks)
+
+    def _follow(self, chunks):
+        try:
+            yield from chunks
+        except GeneratorExit:
+            raise
+        except BaseException as e:
+            self._span.error = type(e).__name__
+            raise
+        finally:
+            self._finish()
+
+    def _finish(self):
+        self._span.duration_ms = (time.perf_counter() - self._started) * 1000
+        self._telemetry._finish(self._span)
+
+
+class Telemetry:
+    """
+    In-process tracing for the hot paths: timing spans (kept in a short ring buffer and
+    folded into per-name latency histograms), labelled counters and hit/miss ratios.
+    Exported as JSON (`snapshot`) or Prometheus text (`to_prometheus`).
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.started_at = time.time()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._counters = {}
+        self._histograms = {}
+        self._recent = deque(maxlen=RECENT_SPANS)
+
+    def _stack(self):
+        stack = getattr(self._local, "stack", None)
+        if stack is None:
+            stack = self._local.stack = []
+        return stack
+
+    def span(self, name, **attributes):
+        """
+        Context manager timing a block: `with telemetry.span("nepse.call", method=m) as span: ...`
+        """
+        if not self.enabled:
+            return _NOOP_SPAN
+        stack = self._stack()
+        return _SpanContext(self, Span(name, attributes, stack[-1] if stack else None))
+
+    def _finish(self, span):
+        key = (span.name, (("outcome", "error" if span.error else "ok"),))
+        with self._lock:
+            self._histograms.setdefault(key, Histogram()).observe(span.duration_ms)
+            self._recent.append(span)
+
+    def count(self, name, value=1, **labels):
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, value_ms, **labels):
+        """
+        Records a latency that isn't a block of code (e.g. time to the first streamed chunk).
+        """
+        if not self.enabled:
+            return
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self._histograms.setdefault(key, Histogram()).observe(value_ms)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+            self._recent.clear()
+            self.started_at = time.time()
+
+    def hit_ratios(self):
+        """
+        {cache: ratio} for every counter counted with result="hit"/"miss".
+        """
+        totals = {}
+        with self._lock:
+            for (name, labels), value in self._counters.items():
+                result = dict(labels).get("result")
+                if result in ("hit", "miss"):
+                    hits, lookups = totals.get(name, (0, 0))
+                    totals[name] = (hits + (value if result == "hit" else 0), lookups + value)
+        return {name: round(hits / lookups, 3) for name, (hits, lookups) in totals.items() if lookups}
+
+    def snapshot(self, recent=100):
+        with self._lock:
+            counters = [{"name": name, "labels": dict(labels), "value": value} for (name, labels), value in self._counters.items()]
+            histograms = [
+                {"name": name, "labels": dict(labels), **histogram.to_dict()}
+                for (name, labels), histogram in self._histograms.items()
+            ]
+            spans = [
+                {
+                    "name": span.name,
+                    "parent": span.parent,
+                    "start": span.start,
+                    "duration_ms": round(span.duration_ms, 2),
+                    "error": span.error,
+                    "attributes": span.attributes,
+                }
+                for span in list(self._recent)[-recent:]
+            ]
+        return {
+            "enabled": self.enabled,
+            "uptime_seconds": round(time.time() - self.started_at, 1),
+            "counters": sorted(counters, key=lambda c: c["name"]),
+            "histograms": sorted(histograms, key=lambda h: h["name"]),
+            "hit_ratios": self.hit_ratios(),
+            "recent_spans": spans[::-1],
+        }
+
+    def to_json(self, recent=100):
+        return json.dumps(self.snapshot(recent), default=str, indent=2)
+
+    def to_prometheus(self, prefix="nepse_hub_"):
+        lines, typed = [], set()
+        with self._lock:
+            for (name, labels), value in sorted(self._counters.items()):
+                metric = _metric_name(prefix, name) + "_total"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} counter")
+                lines.append(f"{metric}{_label_text(labels)} {value}")
+            for (name, labels), histogram in sorted(self._histograms.items()):
+                metric = _metric_name(prefix, name) + "_ms"
+                if metric not in typed:
+                    typed.add(metric)
+                    lines.append(f"# TYPE {metric} histogram")
+                cumulative = 0
+                for bound, bucket_count in zip(BUCKETS_MS, histogram.counts):
+                    cumulative += bucket_count
+                    le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                    lines.append(f"{metric}_bucket{_label_text(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{metric}_sum{_label_text(labels)} {histogram.sum:.3f}")
+                lines.append(f"{metric}_count{_label_text(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _metric_name(prefix, name):
+    return prefix + "".join(c if c.isalnum() else "_" for c in name)
+
+
+def _label_text(labels):
+    if not labels:
+        return ""
+    escaped = ((key, str(value).replace("\\", "\\\\").replace('"', '\\"')) for key, value in labels)
+    return "{" + ",".join(f'{key}="{value}"' for key, value in escaped) + "}"
+
+
+telemetry = Telemetry(enabled=TELEMETRY_ENABLED)
+span = telemetry.span
+count = telemetry.count
+observe = telemetry.observe
+
+
+def traced(name):
+    """
+    Decorator version of span(): times every call of the function under `name`. A function that
+    returns a generator (a streamed answer) is timed until the generator is done, not just
+    until it is handed back.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not telemetry.enabled:
+                return func(*args, **kwargs)
+            with telemetry.span(name) as span_context:
+                result = func(*args, **kwargs)
+                if inspect.isgenerator(result):
+                    return span_context.follow(result)
+            return result
+        return wrapper
+    return decorator
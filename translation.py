@@ -0,0 +1,241 @@
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+
+from cache_backend import get_shared_cache, make_key
+from settings import data_path
+from telemetry import count, span
+
+LOCALES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "locales")
+
+# Google Translate rejects requests above 5000 characters, keep some headroom
+MAX_REQUEST_CHARS = 4500
+# Short UI strings are sent together in one request, one string per line
+BATCH_SEPARATOR = "\n"
+# Network results for a batch of misses are also shared with the other app workers for this long
+SHARED_CACHE_TTL = 7 * 24 * 60 * 60
+# Only short single-line strings (UI labels, messages) go into the persistent dictionary. Longer
+# text (AI reports, chat answers, briefings) is never asked for twice in the same words for long,
+# it is kept in a small per-process LRU instead
+DICTIONARY_MAX_CHARS = 200
+RECENT_MAX_ENTRIES = 256
+# ...and shared with the other workers only for the hour a report is typically being read
+LONG_TEXT_SHARED_TTL = 60 * 60
+
+
+def is_dictionary_text(text):
+    return len(text) <= DICTIONARY_MAX_CHARS and "\n" not in text
+
+
+def load_catalog(lang):
+    """
+    Precomputed translations of the app's static UI strings (locales/<lang>.json).
+    """
+    path = os.path.join(LOCALES_DIR, f"{lang}.json")
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def make_translator(lang):
+    # deep_translator is only imported once something actually needs the network
+    from deep_translator import GoogleTranslator
+    return GoogleTranslator(source='auto', target=lang)
+
+
+def split_into_chunks(text, max_chars=MAX_REQUEST_CHARS):
+    """
+    Splits long text (e.g. an LLM report) into pieces under `max_chars`, breaking on
+    paragraph boundaries so markdown sections stay intact. A single paragraph that is
+    still too long is cut on line and then hard character boundaries.
+    """
+    chunks, current = [], ""
+    for paragraph in text.split("\n\n"):
+        pieces = [paragraph]
+        if len(paragraph) > max_chars:
+            pieces = [paragraph[i:i + max_chars] for i in range(0, len(paragraph), max_chars)]
+        for piece in pieces:
+            candidate = f"{current}\n\n{piece}" if current else piece
+            if len(candidate) > max_chars and current:
+                chunks.append(current)
+                current = piece
+            else:
+                current = candidate
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+class TranslationService:
+    """
+    Bilingual dictionary in front of GoogleTranslator.
+
+    Lookups go: shipped catalog -> in-memory dict -> on-disk SQLite dictionary -> network.
+    Misses from one render are collected and translated together (several short strings per
+    request). Short strings learned from the network are persisted so they survive restarts;
+    long text only lives in a bounded LRU. With a shared cache, workers that hit the same
+    misses at the same time make one request.
+    """
+
+    def __init__(self, path=None, shared_cache=None):
+        self.shared_cache = shared_cache
+        self._lock = threading.Lock()
+        self._memory = {}
+        self._recent = OrderedDict()
+        self._conn = sqlite3.connect(path or data_path("translations.sqlite3"), check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS translations (
+                lang TEXT NOT NULL,
+                source TEXT NOT NULL,
+                target TEXT NOT NULL,
+                PRIMARY KEY (lang, source)
+            )
+            """
+        )
+        # dictionaries written before the length cap also hold whole reports, drop those
+        self._conn.execute("DELETE FROM translations WHERE length(source) > ? OR instr(source, char(10)) > 0", (DICTIONARY_MAX_CHARS,))
+        self._conn.commit()
+
+    def _known(self, lang):
+        # The catalog plus everything persisted for this language, loaded once per process
+        with self._lock:
+            if lang not in self._memory:
+                known = dict(load_catalog(lang))
+                rows = self._conn.execute("SELECT source, target FROM translations WHERE lang = ?", (lang,))
+                known.update({source: target for source, target in rows})
+                self._memory[lang] = known
+            return self._memory[lang]
+
+    def _recall(self, lang, text):
+        with self._lock:
+            key = (lang, text)
+            if key in self._recent:
+                self._recent.move_to_end(key)
+                return self._recent[key]
+        return None
+
+    def _remember(self, lang, pairs):
+        if not pairs:
+            return
+        persistent = {source: target for source, target in pairs.items() if is_dictionary_text(source)}
+        with self._lock:
+            self._memory[lang].update(persistent)
+            for source, target in pairs.items():
+                if source not in persistent:
+                    self._recent[(lang, source)] = target
+                    self._recent.move_to_end((lang, source))
+            while len(self._recent) > RECENT_MAX_ENTRIES:
+                self._recent.popitem(last=False)
+            if persistent:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO translations (lang, source, target) VALUES (?, ?, ?)",
+                    [(lang, source, target) for source, target in persistent.items()],
+                )
+                self._conn.commit()
+
+    def _translate_batch(self, texts, lang):
+        """
+        Translates single-line strings, packing as many as fit into each request.
+        Falls back to one request per string if the translated batch doesn't split back cleanly.
+        """
+        translator = make_translator(lang)
+        results, batch = {}, []
+
+        def flush():
+            if not batch:
+                return
+            translated = translator.translate(BATCH_SEPARATOR.join(batch)) or ""
+            lines = translated.split(BATCH_SEPARATOR)
+            if len(lines) == len(batch):
+                results.update(zip(batch, (line.strip() for line in lines)))
+            else:
+                for text in batch:
+                    results[text] = translator.translate(text)
+            batch.clear()
+
+        size = 0
+        for text in texts:
+            if batch and size + len(text) + 1 > MAX_REQUEST_CHARS:
+                flush()
+                size = 0
+            batch.append(text)
+            size += len(text) + 1
+        flush()
+        return results
+
+    def _translate_long(self, text, lang):
+        translator = make_translator(lang)
+        return "\n\n".join(translator.translate(chunk) or chunk for chunk in split_into_chunks(text))
+
+    def _fetch(self, misses, lang):
+        learned = {}
+        try:
+            short = [t for t in misses if "\n" not in t and len(t) < MAX_REQUEST_CHARS]
+            learned.update(self._translate_batch(short, lang))
+            for text in misses:
+                if text not in learned:
+                    learned[text] = self._translate_long(text, lang)
+        except Exception as e:
+            print(f"Translation Error: {e}")
+        return learned
+
+    def translate_many(self, texts, lang):
+        """
+        Translates a list of strings, returning {source: translation}. Everything already known
+        costs nothing; the misses are fetched in as few requests as possible.
+        """
+        texts = [t for t in dict.fromkeys(texts) if t and isinstance(t, str)]
+        if lang == 'en' or not texts:
+            return {t: t for t in texts}
+
+        known = self._known(lang)
+        found = {}
+        for text in texts:
+            target = known.get(text) or self._recall(lang, text)
+            if target:
+                found[text] = target
+        misses = [t for t in texts if t not in found]
+        count("translation_cache", len(found), result="hit")
+        count("translation_cache", len(misses), result="miss")
+        if misses:
+            ttl = SHARED_CACHE_TTL if all(is_dictionary_text(t) for t in misses) else LONG_TEXT_SHARED_TTL
+            with span("translation.fetch", lang=lang, strings=len(misses)):
+                if self.shared_cache:
+                    learned = self.shared_cache.get_or_compute(
+                        make_key("translation", lang, tuple(misses)), lambda: self._fetch(misses, lang),
+                        ttl, cache_if=lambda result: len(result) == len(misses),
+                    )
+                else:
+                    learned = self._fetch(misses, lang)
+            learned = {s: t for s, t in learned.items() if t}
+            self._remember(lang, learned)
+            found.update(learned)
+
+        return {t: found.get(t, t) for t in texts}
+
+    def translate(self, text, lang):
+        if not text or not isinstance(text, str) or lang == 'en':
+            return text
+        return self.translate_many([text], lang)[text]
+
+    def prefetch(self, texts, lang):
+        """
+        Warms the dictionary with every string a render is about to need, in one batch.
+        """
+        self.translate_many(texts, lang)
+
+
+_default_service = None
+_default_service_lock = threading.Lock()
+
+
+def get_translation_service():
+    global _default_service
+    with _default_service_lock:
+        if _default_service is None:
+            _default_service = TranslationService(shared_cache=get_shared_cache())
+        return _default_service